@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import numpy as np
+from aiohttp import web
+from artifact import FORM_PATH, SEASON_PATH, dataset_version, default_form, file_version, read_version
+from bootstrap import bootstrap_intervals
+from matches import current_form, load_matches
+from model import PREDICTORS, rank_form
+from search_index import SearchIndex, fold
+from threshold_sweep import COEFFICIENTS, FIT_FIELDS, caps_at, sweep
+
+# Read-only JSON API over the form rankings. Everything a request can see is computed once
+# per dataset version and held as encoded bytes; requests only slice and concatenate them.
+# Every response is a pure function of the snapshot and the URL, so the snapshot version
+# serves as the ETag of every resource and a matching If-None-Match costs no work at all.
+# Form comes from the same source as the app's default view: the match store over the
+# default window when it exists, else the scraped form dataset.
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+SEARCH_LIMIT = 10
+PAGE_CACHE_SIZE = 1024
+RANKING_FIELDS = {
+    "rank": "Rank", "rank_low": "Rank Low", "rank_high": "Rank High", "player": "Player", "team": "Team",
+    "npgi90": "NPGI Per 90", "npgi90_low": "NPGI Low", "npgi90_high": "NPGI High",
+    "npxg90": "npxG90", "xa90": "xA90", "xgchain90": "xGChain90", "xgbuildup90": "xGBuildup90"
+}
+
+def encode(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+def json_value(value):
+    """Plain JSON value for a frame cell; ranks stay numbers, NaN becomes null"""
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    if not math.isfinite(value):
+        return None
+    return int(value) if value.is_integer() else round(value, 4)
+
+class Snapshot:
+    """Encoded rankings, players and coefficients for one pair of dataset versions"""
+
+    def __init__(self, season_df, form_df, threshold, versions):
+        self.version = hashlib.sha1(f"{versions}-{threshold}".encode()).hexdigest()[:16]
+        self.etag = f'"{self.version}"'
+        fits = sweep(season_df)
+        caps = caps_at(fits, threshold)
+
+        ranked = rank_form(form_df, caps)
+        X = np.column_stack([np.ones(len(ranked)), ranked[PREDICTORS].to_numpy(float)])
+        ranked = ranked.join(bootstrap_intervals(X, ranked['NPxG90_xA90'], index=ranked.index))
+        self.records = [{field: json_value(row[col]) for field, col in RANKING_FIELDS.items()}
+                        for row in ranked[list(RANKING_FIELDS.values())].to_dict("records")]
+        self.rows = [encode(record) for record in self.records]
+        self.search_index = SearchIndex(ranked['Player'], ranked['Team'])
+
+        # Row positions per team, and one lookup key per player
+        self.teams = {}
+        for position, record in enumerate(self.records):
+            self.teams.setdefault(fold(record["team"]), []).append(position)
+        self.players = {}
+        for row, record in zip(self.rows, self.records):
+            self.players.setdefault(fold(record["player"]), row)
+
+        fit = fits.loc[threshold]
+        self.coefficients = encode({
+            "version": self.version,
+            "threshold": threshold,
+            "caps": caps,
+            "coefficients": {name: json_value(fit[name]) for name in COEFFICIENTS},
+            "fit": {name: json_value(fit[name]) for name in FIT_FIELDS if name not in COEFFICIENTS}
+        })
+        self.pages = {}
+
+    def page(self, team, page, per_page):
+        """Encoded body of one page of the rankings, optionally for one team"""
+        key = (team, page, per_page)
+        body = self.pages.get(key)
+        if body is None:
+            positions = self.teams.get(team, []) if team else range(len(self.rows))
+            total = len(positions)
+            selected = positions[(page - 1) * per_page:page * per_page]
+            header = encode({"version": self.version, "page": page, "per_page": per_page, "total": total,
+                             "pages": math.ceil(total / per_page)})
+            body = header[:-1] + b',"results":[' + b",".join(self.rows[i] for i in selected) + b"]}"
+            if len(self.pages) >= PAGE_CACHE_SIZE:
+                self.pages.clear()
+            self.pages[key] = body
+        return body
+
+def etag_matches(header, etag):
+    """Whether an If-None-Match header covers the ETag (weak comparison)"""
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def int_param(request, name, default, maximum=None):
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+    if value < 1:
+        raise web.HTTPBadRequest(text=f"{name} must be at least 1")
+    return min(value, maximum) if maximum else value
+
+class RankingsService:
+    """Holds the current snapshot and swaps in a new one when a dataset changes"""
+
+    def __init__(self, threshold=60, poll_interval=5.0):
+        self.threshold = threshold
+        self.poll_interval = poll_interval
+        self.versions = None
+        self.snapshot = None
+        self.watcher = None
+
+    def current_versions(self):
+        """Season dataset version, and the form source's path, version and window"""
+        form_path, window = default_form()
+        form_version = dataset_version(FORM_PATH) if window is None else file_version(form_path)
+        return dataset_version(SEASON_PATH), (form_path, form_version, window)
+
+    def build(self, versions):
+        season_version, (form_path, form_version, window) = versions
+        if window is None:
+            form_df = read_version(FORM_PATH, form_version)
+        else:
+            form_df = current_form(load_matches(form_path), games=window)
+        return Snapshot(read_version(SEASON_PATH, season_version), form_df, self.threshold, versions)
+
+    async def refresh(self):
+        """Rebuild the snapshot off the event loop if either dataset has a new version"""
+        loop = asyncio.get_event_loop()
+        versions = await loop.run_in_executor(None, self.current_versions)
+        if versions == self.versions:
+            return
+        # Requests keep being served from the previous snapshot until the new one is ready
+        self.snapshot = await loop.run_in_executor(None, self.build, versions)
+        self.versions = versions
+        logging.info(f"Serving snapshot {self.snapshot.version} ({len(self.snapshot.rows)} players)")
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Snapshot refresh failed: {e}", exc_info=True)
+
+    def respond(self, request, body, snapshot):
+        """JSON response for a body, or a body-building callable, unless the client's copy is current"""
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("If-None-Match"), snapshot.etag):
+            return web.Response(status=304, headers=headers)
+        body = body() if callable(body) else body
+        return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+
+    async def rankings(self, request):
+        snapshot = self.snapshot
+        page = int_param(request, "page", 1)
+        per_page = int_param(request, "per_page", DEFAULT_PER_PAGE, MAX_PER_PAGE)
+        team = fold(request.query.get("team", ""))
+        return self.respond(request, lambda: snapshot.page(team, page, per_page), snapshot)
+
+    async def player(self, request):
+        snapshot = self.snapshot
+        row = snapshot.players.get(fold(request.match_info["name"]))
+        if row is None:
+            raise web.HTTPNotFound(text="Unknown player")
+        return self.respond(request, row, snapshot)
+
+    async def search(self, request):
+        snapshot = self.snapshot
+        query = request.query.get("q", "")
+        if not query.strip():
+            raise web.HTTPBadRequest(text="q is required")
+        limit = int_param(request, "limit", SEARCH_LIMIT, MAX_PER_PAGE)
+        body = lambda: b"[" + b",".join(snapshot.rows[i] for i in snapshot.search_index.search(query, limit=limit)) + b"]"
+        return self.respond(request, body, snapshot)
+
+    async def coefficients(self, request):
+        snapshot = self.snapshot
+        return self.respond(request, snapshot.coefficients, snapshot)
+
+    async def version(self, request):
+        return web.json_response({"version": self.snapshot.version, "players": len(self.snapshot.rows)})
+
+def create_app(service):
+    app = web.Application()
+    app.router.add_get("/rankings", service.rankings)
+    app.router.add_get("/players", service.search)
+    app.router.add_get("/players/{name}", service.player)
+    app.router.add_get("/coefficients", service.coefficients)
+    app.router.add_get("/version", service.version)
+
+    async def start(app):
+        await service.refresh()
+        service.watcher = asyncio.ensure_future(service.watch())
+
+    async def stop(app):
+        service.watcher.cancel()
+
+    app.on_startup.append(start)
+    app.on_cleanup.append(stop)
+    return app
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Serve the form rankings as JSON")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--threshold", type=int, default=60, help="season minutes threshold (%%) used for capping")
+    parser.add_argument("--poll", type=float, default=5.0, help="seconds between dataset version checks")
+    args = parser.parse_args()
+
+    web.run_app(create_app(RankingsService(args.threshold, args.poll)), host=args.host, port=args.port,
+                access_log=None)
@@ -0,0 +1,113 @@
+import argparse
+import json
+import logging
+import os
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import db
+from bootstrap import bootstrap_intervals
+from matches import MATCHES_PATH, current_form, load_matches
+from model import PREDICTORS, rank_form
+from sidecar import file_digest, read_dataset
+from threshold_sweep import caps_at, sweep
+
+# Start-up model for the app's rankings tab, written by the refresh jobs: the season sweep
+# (caps and fit statistics at every threshold) and the default view's ranked form table with
+# its bootstrap intervals. Like a sidecar it records what it was built from, here the content
+# hash of each dataset, so the app can use it without loading or fitting anything.
+ARTIFACT_PATH = "data/model_artifact.feather"
+SEASON_PATH = "data/season_stats.csv"
+FORM_PATH = "data/form_stats.csv"
+DEFAULT_THRESHOLD = 60
+DEFAULT_WINDOW = 5
+RANKING_COLUMNS = ['Rank', 'Rank Low', 'Rank High', 'Player', 'Team', 'NPGI Per 90', 'NPGI Low', 'NPGI High',
+                   'npxG90', 'xA90', 'xGChain90', 'xGBuildup90']
+METADATA_KEY = b"model_artifact"
+
+Artifact = namedtuple("Artifact", ["threshold", "window", "sweep", "rankings"])
+
+def dataset_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def file_version(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def dataset_version(path):
+    """Cheap version key for a dataset that changes whenever the scrapers rewrite it"""
+    # With DATABASE_URL set, every reader uses the latest load from Postgres instead
+    if db.DATABASE_URL:
+        return f"db-{db.dataset_version(dataset_name(path))}"
+    return file_version(path)
+
+def read_version(path, version):
+    """A scraped dataset as of a version, from Postgres or from its sidecar or CSV"""
+    if version.startswith("db-"):
+        df = db.read_dataset(dataset_name(path))
+    else:
+        df = read_dataset(path)
+    return df.drop_duplicates(subset=['Player'], keep='first')
+
+def source_key(path, version):
+    """Content identity of a dataset version, which unlike a file's mtime survives a checkout"""
+    return version if version.startswith("db-") else file_digest(path).decode()
+
+def default_form():
+    """Path and window of the app's default form view; the match store allows any window"""
+    if os.path.exists(MATCHES_PATH):
+        return MATCHES_PATH, DEFAULT_WINDOW
+    return FORM_PATH, None
+
+def write_artifact(path=ARTIFACT_PATH, threshold=DEFAULT_THRESHOLD):
+    """Build the start-up model from the data as the app will read it"""
+    season_version = dataset_version(SEASON_PATH)
+    form_path, window = default_form()
+    if window is None:
+        form_version = dataset_version(FORM_PATH)
+        form_df = read_version(FORM_PATH, form_version)
+    else:
+        form_version = file_version(MATCHES_PATH)
+        form_df = current_form(load_matches(MATCHES_PATH), games=window)
+
+    fits = sweep(read_version(SEASON_PATH, season_version))
+    ranked = rank_form(form_df, caps_at(fits, threshold))
+    X = np.column_stack([np.ones(len(ranked)), ranked[PREDICTORS].to_numpy(float)])
+    ranked = ranked.join(bootstrap_intervals(X, ranked['NPxG90_xA90'], index=ranked.index))
+
+    table = pa.Table.from_pandas(ranked[RANKING_COLUMNS], preserve_index=True)
+    metadata = json.dumps({
+        "sources": [source_key(SEASON_PATH, season_version), source_key(form_path, form_version)],
+        "threshold": threshold,
+        "window": window,
+        "sweep": fits.to_dict("split")
+    })
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: metadata.encode()})
+    feather.write_feather(table, f"{path}.partial", compression="uncompressed")
+    os.replace(f"{path}.partial", path)
+    logging.info(f"Saved model artifact {path} ({len(ranked)} players at {threshold}%)")
+    return path
+
+def read_artifact(sources, path=ARTIFACT_PATH):
+    """The artifact, or None when it is missing or was built from other season and form data"""
+    if not os.path.exists(path):
+        return None
+    table = feather.read_table(path, memory_map=True)
+    metadata = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b"{}"))
+    if metadata.get("sources") != list(sources):
+        logging.info(f"Model artifact {path} is stale")
+        return None
+    fits = metadata["sweep"]
+    fits = pd.DataFrame(fits["data"], index=pd.Index(fits["index"], name='threshold'), columns=fits["columns"])
+    return Artifact(metadata["threshold"], metadata["window"], fits, table.to_pandas())
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Build the app's start-up model from the current datasets")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="season minutes threshold (%%) of the rankings")
+    parser.add_argument("--output", default=ARTIFACT_PATH)
+    args = parser.parse_args()
+    write_artifact(args.output, args.threshold)
@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import urlsplit
+import pandas as pd
+from playwright.async_api import async_playwright
+import db
+import metrics
+from artifact import write_artifact
+from columns import FORM_COLUMNS, SEASON_COLUMNS
+from datasets import CSV_PATHS, record_dataset
+from understat import (
+    LEAGUES, PARTITIONED_ROOT, PLAYER_ROWS, PLAYERS_DATA_SCRIPT, PLAYERS_STATS_URL,
+    current_season, form_data_request, form_record, is_app_season, is_player_data_response, league_url,
+    parse_players, partition_path, players_from_payload, season_record
+)
+
+# One unit of work: a single page load or XHR that yields the rows for one dataset,
+# league and season
+Job = namedtuple("Job", ["dataset", "url", "last_matches", "league", "season"])
+
+DATASETS = ("season_stats", "form_stats")
+COLUMNS = {"season_stats": SEASON_COLUMNS, "form_stats": FORM_COLUMNS}
+OUTPUTS = {dataset: (CSV_PATHS[dataset], COLUMNS[dataset]) for dataset in DATASETS}
+
+def make_jobs(leagues=("EPL",), seasons=(None,), datasets=DATASETS, last_matches=5):
+    """One job per dataset, league and season; a season of None is the current one"""
+    jobs = []
+    for league in leagues:
+        for season in seasons:
+            season = season or current_season()
+            if "season_stats" in datasets:
+                jobs.append(Job("season_stats", league_url(league, season), None, league, season))
+            if "form_stats" in datasets:
+                jobs.append(Job("form_stats", PLAYERS_STATS_URL, last_matches, league, season))
+    return jobs
+
+DEFAULT_JOBS = make_jobs()
+
+class CsvStreamWriter:
+    """Append records to per-dataset CSVs as they arrive and swap them into place on close"""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.files = {}
+        self.writers = {}
+        self.counts = {}
+        self.datasets = {}
+        # App datasets whose CSV this writer replaced
+        self.saved = []
+
+    def target(self, job):
+        """Output path and columns for a job's rows"""
+        return self.outputs[job.dataset]
+
+    def write(self, job, records):
+        if not records:
+            return
+        path, columns = self.target(job)
+        if path not in self.writers:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.files[path] = open(f"{path}.partial", "w", newline="", encoding="utf-8")
+            self.writers[path] = csv.DictWriter(self.files[path], fieldnames=columns)
+            self.writers[path].writeheader()
+            self.counts[path] = 0
+            self.datasets[path] = job.dataset
+        self.writers[path].writerows(records)
+        self.files[path].flush()
+        self.counts[path] += len(records)
+
+    def close(self, commit=True):
+        # Outputs that received no rows keep their previous CSV untouched
+        for path, handle in self.files.items():
+            handle.close()
+            if commit:
+                os.replace(f"{path}.partial", path)
+                logging.info(f"Saved {self.counts[path]} records to {path}")
+                # The app's CSVs get the same sidecar and snapshot as every other scraper's
+                dataset = self.datasets[path]
+                if path == CSV_PATHS.get(dataset):
+                    record_dataset(dataset)
+                    self.saved.append(dataset)
+            else:
+                os.remove(f"{path}.partial")
+
+class PartitionedWriter(CsvStreamWriter):
+    """Stream rows into a hive-style dataset/league/season partition layout"""
+
+    def __init__(self, root=PARTITIONED_ROOT):
+        super().__init__(COLUMNS)
+        self.root = root
+
+    def target(self, job):
+        return partition_path(job.dataset, job.league, job.season, self.root), COLUMNS[job.dataset]
+
+    def write(self, job, records):
+        # Each job is one partition, committed as soon as it arrives so a failed run keeps it
+        super().write(job, records)
+        path = self.target(job)[0]
+        if path in self.files:
+            self.files.pop(path).close()
+            self.writers.pop(path)
+            os.replace(f"{path}.partial", path)
+            logging.info(f"Saved {self.counts.pop(path)} records to {path}")
+
+    def done(self, job):
+        """True when the job's partition was written by an earlier run"""
+        return os.path.exists(self.target(job)[0])
+
+class HostRateLimiter:
+    """Space out request starts to each host by at least 1 / rate seconds"""
+
+    def __init__(self, rate=None):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = {}
+
+    async def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        now = asyncio.get_running_loop().time()
+        # Slots are reserved before sleeping, so concurrent callers queue up in order
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+async def page_dataset(context, url, script, is_data_response, from_payload, ready_selector=None):
+    """Load a page and read the dataset it embeds, or failing that the one its XHRs deliver"""
+    page = await context.new_page()
+    responses = []
+    page.on("response", lambda response: responses.append(response) if is_data_response(response) else None)
+    try:
+        await page.goto(url, timeout=30000)
+        if ready_selector:
+            await page.wait_for_selector(ready_selector, timeout=15000)
+        data = await page.evaluate(script)
+        if not data and not responses:
+            await page.wait_for_load_state("networkidle")
+        for response in responses:
+            if data:
+                break
+            data = from_payload(await response.json())
+        return data or []
+    finally:
+        await page.close()
+
+async def league_players(context, url):
+    """Raw understat player entries (ids, games and totals) from a league page"""
+    return await page_dataset(context, url, PLAYERS_DATA_SCRIPT, is_player_data_response, players_from_payload, PLAYER_ROWS)
+
+async def fetch_season(context, job):
+    """Load a league page and read its embedded (or XHR-delivered) season dataset"""
+    return parse_players(await league_players(context, job.url), season_record)
+
+async def fetch_form(context, job):
+    """Request a last-N-games dataset through the shared browser context"""
+    response = await context.request.post(job.url, form=form_data_request(job.league, job.season, job.last_matches))
+    if not response.ok:
+        raise RuntimeError(f"status {response.status}")
+    return parse_players(players_from_payload(await response.json()) or [], form_record)
+
+async def run_jobs(context, jobs, writer, concurrency=4, fetchers=None, limiter=None, retries=2, backoff=2.0):
+    """Fetch jobs concurrently, at most `concurrency` at a time, writing rows as each completes"""
+    fetchers = fetchers or {"season_stats": fetch_season, "form_stats": fetch_form}
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = limiter or HostRateLimiter()
+
+    async def fetch(job):
+        for attempt in range(retries + 1):
+            async with semaphore:
+                await limiter.wait(job.url)
+                started = time.perf_counter()
+                try:
+                    with metrics.timer("fetch", dataset=job.dataset):
+                        records = await fetchers[job.dataset](context, job)
+                    metrics.count("rows", len(records), dataset=job.dataset)
+                    logging.info(f"Fetched {len(records)} {job.dataset} rows for {job.league} {job.season} in {time.perf_counter() - started:.1f}s")
+                    return job, records
+                except Exception as e:
+                    error = e
+            # Back off outside the semaphore so other jobs keep the pool busy
+            if attempt < retries:
+                delay = backoff * 2 ** attempt
+                metrics.count("retries", dataset=job.dataset)
+                logging.warning(f"Job {job.dataset} {job.league} {job.season} failed ({error}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+        logging.error(f"Job {job.dataset} {job.league} {job.season} failed after {retries + 1} attempts: {error}")
+        metrics.count("failed_jobs", dataset=job.dataset)
+        return job, []
+
+    total = 0
+    for finished in asyncio.as_completed([fetch(job) for job in jobs]):
+        job, records = await finished
+        writer.write(job, records)
+        total += len(records)
+    return total
+
+def load_saved(datasets):
+    """Load the app datasets a run replaced into Postgres and rebuild the model artifact,
+    as run_daily.py does after its scrape"""
+    if not datasets:
+        return
+    if db.DATABASE_URL:
+        with metrics.timer("db_load"):
+            db.load_run({dataset: pd.read_csv(CSV_PATHS[dataset]) for dataset in datasets})
+    try:
+        with metrics.timer("artifact"):
+            write_artifact()
+    except Exception as e:
+        logging.warning(f"Could not write the model artifact: {e}")
+
+async def scrape(jobs=DEFAULT_JOBS, concurrency=4, rate=None, writer=None):
+    """Run the jobs in one headless browser and stream their rows into the dataset CSVs"""
+    writer = writer or CsvStreamWriter(OUTPUTS)
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            context = await browser.new_context()
+            total = await run_jobs(context, jobs, writer, concurrency, limiter=HostRateLimiter(rate))
+        except BaseException:
+            writer.close(commit=False)
+            raise
+        else:
+            writer.close()
+        finally:
+            await browser.close()
+    logging.info(f"Total rows written: {total}")
+    return total
+
+if __name__ == "__main__":
+    # Setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f'async_stats_{datetime.now().strftime("%Y%m%d")}.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Scrape understat datasets concurrently")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum pages or requests in flight")
+    parser.add_argument("--rate", type=float, default=None, help="maximum requests started per second per host")
+    parser.add_argument("--leagues", nargs="+", choices=LEAGUES, default=["EPL"])
+    parser.add_argument("--seasons", nargs="+", type=int, default=[None], help="season start years (default: current season)")
+    parser.add_argument("--datasets", nargs="+", choices=DATASETS, default=list(DATASETS))
+    parser.add_argument("--partitioned", nargs="?", const=PARTITIONED_ROOT, default=None, metavar="ROOT",
+                        help=f"write dataset=/league=/season= partitions under ROOT (default {PARTITIONED_ROOT}) instead of the app CSVs")
+    parser.add_argument("--resume", action="store_true", help="skip partitions an earlier run already wrote")
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.leagues, args.seasons, args.datasets)
+    if not args.partitioned and not all(is_app_season(job.league, job.season) for job in jobs):
+        parser.error("the app CSVs hold the current EPL season only; other leagues or seasons need --partitioned output")
+    writer = PartitionedWriter(args.partitioned) if args.partitioned else CsvStreamWriter(OUTPUTS)
+    if args.resume:
+        if not args.partitioned:
+            parser.error("--resume needs --partitioned output")
+        remaining = [job for job in jobs if not writer.done(job)]
+        logging.info(f"Resuming: {len(jobs) - len(remaining)} of {len(jobs)} partitions already written")
+        jobs = remaining
+    with metrics.run("async_stats"):
+        asyncio.run(scrape(jobs, args.concurrency, args.rate, writer))
+        load_saved(writer.saved)
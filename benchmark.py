@@ -0,0 +1,311 @@
+import argparse
+import ast
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from statsmodels.stats.outliers_influence import variance_inflation_factor
+from artifact import write_artifact
+from bootstrap import bootstrap_intervals
+from columns import FORM_COLUMNS, SEASON_COLUMNS
+from fixture_server import FIXTURES_DIR
+from influence import model_influence
+from model import PREDICTORS, add_features, apply_capping, calculate_season_caps, rank_form
+from search_index import SearchIndex
+from threshold_sweep import sweep
+from understat import parse_players, parse_players_data, parse_rows, parse_season_row, season_record
+
+# Offline benchmarks for the scrape parsing, the models and the Streamlit app. Player tables
+# are resampled from data/ with jittered metrics to each size, and the saved league page is
+# rebuilt around the same number of players. Each case records its best and median time;
+# a case slower than its threshold in benchmark_thresholds.json fails the run, and so does
+# an app whose start-up imports any of the deferred modules. Thresholds are relative to a
+# fixed calibration workload: on a machine that runs it twice as slowly as the one that
+# wrote them, every threshold doubles.
+SEASON_PATH = "data/season_stats.csv"
+FORM_PATH = "data/form_stats.csv"
+LEAGUE_FIXTURE = os.path.join(FIXTURES_DIR, "league_EPL.html")
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regress.py")
+THRESHOLDS_PATH = "benchmark_thresholds.json"
+RESULTS_PATH = "benchmark_results.json"
+SIZES = (500, 5000, 50000)
+APP_SIZES = (500, 5000)
+# Sub-millisecond cases are mostly timer noise, so no threshold is tighter than this
+MIN_THRESHOLD = 0.005
+# Stored with the thresholds as the calibration time of the machine that wrote them
+CALIBRATION = "calibration"
+# Imported only once the Model Summary tab is used; loading any of them at start-up fails the run
+DEFERRED_MODULES = ("statsmodels", "matplotlib", "seaborn", "scipy", "playwright", "psycopg2", "schedule")
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{imports}
+print(json.dumps({{"seconds": time.perf_counter() - started, "modules": sorted({{name.split(".")[0] for name in sys.modules}})}}))
+"""
+METRICS = ["xA90", "NPxG90_xA90", "xGChain90", "xGBuildup90"]
+
+def scale_table(df, rows, seed=0):
+    """A table of `rows` players resampled from df, metrics jittered by about 10%"""
+    rng = np.random.default_rng(seed)
+    scaled = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+    scaled["Player"] = [f"{player} {n}" for n, player in enumerate(scaled["Player"])]
+    for col in METRICS + [c for c in ["NpGI90"] if c in scaled]:
+        scaled[col] = (scaled[col] * rng.lognormal(0, 0.1, rows)).round(3)
+    if "Minutes" in scaled:
+        scaled["Minutes"] = np.maximum(1, scaled["Minutes"] + rng.integers(-90, 90, rows))
+    return scaled
+
+def scale_players(players, rows):
+    """playersData entries repeated to `rows` players with unique ids and names"""
+    return [dict(players[n % len(players)], id=str(n), player_name=f"{players[n % len(players)]['player_name']} {n}")
+            for n in range(rows)]
+
+def league_page(players):
+    """League page source with the players embedded the way understat ships them"""
+    payload = json.dumps(players).replace("'", "\\'")
+    escaped = "".join(f"\\x{ord(c):02x}" if c in '"<>&' else c for c in payload)
+    return f"<html><script>var playersData = JSON.parse('{escaped}');</script></html>"
+
+def table_cells(players):
+    """Season table rows as the DOM scraper extracts them"""
+    cells = []
+    for p in players:
+        minutes = int(p["time"])
+        per90 = lambda value: f"{float(value) * 90 / minutes:.2f}" if minutes else "0.00"
+        cells.append([p["player_name"], p["team_title"], p["games"], p["time"], p["npg"], p["assists"],
+                      p["xG"], per90(p["xA"]), per90(float(p["npxG"]) + float(p["xA"])),
+                      per90(p["xGChain"]), per90(p["xGBuildup"])])
+    return cells
+
+class Suite:
+    """Collects timings of named cases"""
+
+    def __init__(self, repeat=5):
+        self.repeat = repeat
+        self.results = {}
+
+    def case(self, name, rows, fn, repeat=None):
+        times = []
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+        self.record(name, rows, times)
+
+    def record(self, name, rows, times):
+        key = f"{name}/{rows}" if rows else name
+        self.results[key] = {"rows": rows, "best": min(times), "median": statistics.median(times), "runs": len(times)}
+        logging.info(f"{key}: best {min(times) * 1000:.1f}ms, median {statistics.median(times) * 1000:.1f}ms")
+
+def calibration_workload():
+    """Fixed mix of NumPy and interpreter work that tracks how fast the machine is"""
+    values = np.random.default_rng(0).random(1_000_000)
+    np.sort(values)
+    total = 0.0
+    for value in values[:300_000].tolist():
+        total += value * value
+    return total
+
+def scrape_cases(suite, sizes):
+    with open(LEAGUE_FIXTURE, encoding="utf-8") as f:
+        fixture = f.read()
+    suite.case("parse_league_fixture", None, lambda: parse_players(parse_players_data(fixture), season_record))
+    players = parse_players_data(fixture)
+    for rows in sizes:
+        scaled = scale_players(players, rows)
+        page = league_page(scaled)
+        cells = table_cells(scaled)
+        suite.case("decode_players_data", rows, lambda: parse_players_data(page))
+        suite.case("season_records", rows, lambda: parse_players(scaled, season_record))
+        suite.case("parse_table_rows", rows, lambda: parse_rows(cells, parse_season_row))
+
+def model_cases(suite, sizes, season_df, form_df):
+    for rows in sizes:
+        season = scale_table(season_df, rows)
+        form = scale_table(form_df, rows, seed=1)
+        caps = calculate_season_caps(season, 0.6)
+        capped = add_features(apply_capping(season, caps))
+        X = sm.add_constant(capped[PREDICTORS])
+        y = capped['NpGI90']
+        wls = sm.WLS(y, X, weights=capped['Minutes']).fit()
+
+        def diagnostics():
+            sm.stats.diagnostic.normal_ad(wls.resid)
+            sm.stats.diagnostic.het_breuschpagan(wls.resid, wls.model.exog)
+            [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
+
+        suite.case("calculate_season_caps", rows, lambda: calculate_season_caps(season, 0.6))
+        suite.case("apply_capping", rows, lambda: apply_capping(form, caps))
+        suite.case("threshold_sweep", rows, lambda: sweep(season), repeat=1 if rows > 5000 else None)
+        suite.case("wls_fit", rows, lambda: sm.WLS(y, X, weights=capped['Minutes']).fit())
+        suite.case("ols_fit", rows, lambda: sm.OLS(y, X).fit())
+        suite.case("diagnostics", rows, diagnostics)
+        suite.case("influence", rows, lambda: model_influence(wls))
+        ranked = rank_form(form, caps)
+        X_form = sm.add_constant(ranked[PREDICTORS])
+        suite.case("rank_form", rows, lambda: rank_form(form, caps))
+        suite.case("bootstrap_intervals", rows, lambda: bootstrap_intervals(X_form, ranked['NPxG90_xA90']), repeat=1 if rows > 5000 else None)
+        index = SearchIndex(ranked['Player'], ranked['Team'])
+        suite.case("search_index_build", rows, lambda: SearchIndex(ranked['Player'], ranked['Team']))
+        suite.case("search_query", rows, lambda: index.search("mo salah"))
+
+def app_imports():
+    """The import statements at the top level of the app"""
+    with open(APP_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def startup_cases(suite):
+    """Import time of the app's module level, each run in a fresh interpreter"""
+    probe = IMPORT_PROBE.format(imports=app_imports())
+    times, loaded = [], set()
+    for _ in range(suite.repeat):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=os.path.dirname(APP_PATH),
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        times.append(result["seconds"])
+        loaded.update(result["modules"])
+    suite.record("app_imports", None, times)
+    deferred = sorted(loaded.intersection(DEFERRED_MODULES))
+    if deferred:
+        raise RuntimeError(f"App start-up imports {', '.join(deferred)}, which should wait for the Model Summary tab")
+
+def app_cases(suite, sizes, season_df, form_df):
+    """Cold run and reruns of the app under the Streamlit testing harness"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    cwd = os.getcwd()
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            # The app reads data/ relative to the working directory
+            os.makedirs(os.path.join(workdir, "data"))
+            scale_table(season_df, rows)[SEASON_COLUMNS].to_csv(os.path.join(workdir, SEASON_PATH), index=False)
+            scale_table(form_df, rows, seed=1)[FORM_COLUMNS].to_csv(os.path.join(workdir, FORM_PATH), index=False)
+            os.chdir(workdir)
+            try:
+                # As the refresh job leaves it, with the start-up model next to the datasets
+                write_artifact()
+                st.cache_data.clear()
+                st.cache_resource.clear()
+                at = AppTest.from_file(APP_PATH, default_timeout=600)
+                suite.case("app_cold_run", rows, at.run, repeat=1)
+                if at.exception:
+                    raise RuntimeError(f"App failed at {rows} rows: {at.exception[0].message}")
+                suite.case("app_rerun", rows, at.run)
+
+                # Every timed run gets a new value, so none of them is a cache hit
+                thresholds = itertools.cycle(range(50, 100))
+                terms = (f"player {n}" for n in itertools.count())
+
+                # Tabs run lazily, so each case first selects the tab its widget is on
+                def move_threshold():
+                    at.session_state["view"] = "Model Summary"
+                    at.slider[0].set_value(next(thresholds))
+                    at.run()
+
+                def search():
+                    at.session_state["view"] = "NpGI90 Predictor"
+                    at.text_input[0].set_value(next(terms))
+                    at.run()
+
+                at.session_state["view"] = "Model Summary"
+                at.run()
+
+                suite.case("app_threshold_change", rows, move_threshold)
+                at.session_state["view"] = "NpGI90 Predictor"
+                at.run()
+                suite.case("app_search", rows, search)
+            finally:
+                os.chdir(cwd)
+
+def load_thresholds(path=THRESHOLDS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def threshold_scale(results, thresholds):
+    """This machine's calibration time over that of the machine the thresholds came from"""
+    baseline = thresholds.get(CALIBRATION)
+    if not baseline or CALIBRATION not in results:
+        return 1.0
+    return results[CALIBRATION]["best"] / baseline
+
+def check(results, thresholds, scale=1.0):
+    """Cases whose best time exceeds their scaled threshold, marking every result pass or fail"""
+    failures = []
+    for key, result in results.items():
+        limit = thresholds.get(key) if key != CALIBRATION else None
+        if limit is not None:
+            limit = round(max(limit * scale, MIN_THRESHOLD), 4)
+        result["threshold"] = limit
+        result["passed"] = limit is None or result["best"] <= limit
+        if not result["passed"]:
+            failures.append(key)
+    return failures
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the scrapers, models and app")
+    parser.add_argument("--groups", nargs="+", choices=["scrape", "model", "startup", "app"], default=["scrape", "model", "startup", "app"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="player table sizes")
+    parser.add_argument("--app-sizes", nargs="+", type=int, default=list(APP_SIZES), help="table sizes for the app runs")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--update-thresholds", type=float, metavar="FACTOR",
+                        help="write thresholds of FACTOR times this run's best times instead of checking them")
+    args = parser.parse_args()
+
+    season_df = pd.read_csv(SEASON_PATH).drop_duplicates(subset=['Player'], keep='first')
+    form_df = pd.read_csv(FORM_PATH).drop_duplicates(subset=['Player'], keep='first')
+    suite = Suite(args.repeat)
+    suite.case(CALIBRATION, None, calibration_workload)
+    if "scrape" in args.groups:
+        scrape_cases(suite, args.sizes)
+    if "model" in args.groups:
+        model_cases(suite, args.sizes, season_df, form_df)
+    if "startup" in args.groups:
+        startup_cases(suite)
+    if "app" in args.groups:
+        app_cases(suite, args.app_sizes, season_df, form_df)
+
+    if args.update_thresholds:
+        thresholds = load_thresholds(args.thresholds)
+        thresholds.update({key: round(max(result["best"] * args.update_thresholds, MIN_THRESHOLD), 4)
+                           for key, result in suite.results.items()})
+        thresholds[CALIBRATION] = round(suite.results[CALIBRATION]["best"], 4)
+        with open(args.thresholds, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(thresholds.items())), f, indent=2)
+        logging.info(f"Wrote {len(suite.results)} thresholds to {args.thresholds}")
+    thresholds = load_thresholds(args.thresholds)
+    scale = threshold_scale(suite.results, thresholds)
+    logging.info(f"Calibration {suite.results[CALIBRATION]['best'] * 1000:.1f}ms, thresholds scaled by {scale:.2f}")
+    failures = check(suite.results, thresholds, scale)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "threshold_scale": round(scale, 4),
+            "results": suite.results
+        }, f, indent=2)
+    logging.info(f"Saved {len(suite.results)} results to {args.output}")
+
+    for key in failures:
+        result = suite.results[key]
+        logging.error(f"{key} took {result['best'] * 1000:.1f}ms, over its {result['threshold'] * 1000:.1f}ms threshold")
+    sys.exit(1 if failures else 0)
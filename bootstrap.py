@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Bootstrap intervals for the form model's predictions and the rankings built from them.
+# A resample is a vector of multinomial counts over the players, so each chunk of resamples
+# is one batched weighted least-squares solve. Chunks have a fixed size and their own
+# spawned seed, so results do not depend on how many workers share them out.
+INTERVAL_COLUMNS = ['NPGI Low', 'NPGI High', 'Rank Low', 'Rank High']
+
+def _resample_chunk(args):
+    """Predictions and ranks (1 = best) of every player under `size` resamples"""
+    X, y, size, seed = args
+    n = len(y)
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(n, np.full(n, 1 / n), size=size).astype(float)
+
+    xtwx = np.einsum('bn,ni,nj->bij', counts, X, X)
+    xtwy = np.einsum('bn,ni,n->bi', counts, X, y)
+    # pinv keeps the rare resample with too few distinct players from failing the batch
+    beta = np.einsum('bij,bj->bi', np.linalg.pinv(xtwx), xtwy)
+    predictions = beta @ X.T
+    ranks = np.empty_like(predictions, dtype=np.int32)
+    rows = np.arange(size)[:, None]
+    ranks[rows, np.argsort(-predictions, axis=1)] = np.arange(1, n + 1)
+    return predictions, ranks
+
+def bootstrap_intervals(X, y, n_boot=2000, level=0.9, seed=0, workers=None, chunk_size=250, index=None):
+    """Percentile intervals for each player's prediction and rank over n_boot resamples"""
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    sizes = [min(chunk_size, n_boot - start) for start in range(0, n_boot, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(X, y, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if workers and workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            chunks = list(pool.map(_resample_chunk, tasks))
+    else:
+        chunks = [_resample_chunk(task) for task in tasks]
+    predictions = np.concatenate([c[0] for c in chunks])
+    ranks = np.concatenate([c[1] for c in chunks])
+
+    tails = [(1 - level) / 2, (1 + level) / 2]
+    pred_low, pred_high = np.quantile(predictions, tails, axis=0)
+    rank_low, rank_high = np.quantile(ranks, tails, axis=0, method='nearest')
+    return pd.DataFrame(
+        np.column_stack([pred_low, pred_high, rank_low, rank_high]),
+        columns=INTERVAL_COLUMNS, index=index
+    ).astype({'Rank Low': int, 'Rank High': int})
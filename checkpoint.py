@@ -0,0 +1,160 @@
+import json
+import logging
+import math
+import os
+import time
+from datetime import date
+import metrics
+from understat import PLAYER_ROWS, extract_rows, parse_rows, rerender
+
+# Resumable pagination for the DOM scrapers. Every parsed table page is written to a JSON
+# checkpoint together with the pagination cursor, so a run that fails on page N resumes the
+# same day with only the pages it is missing, each retried with exponential backoff.
+CHECKPOINT_DIR = "data/checkpoints"
+PAGE_LINKS = "#league-players a"
+
+class PageCheckpoint:
+    """Parsed pages and pagination cursor of one table scrape, persisted after every page"""
+
+    def __init__(self, name, directory=CHECKPOINT_DIR, today=None):
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.json")
+        self.today = str(today or date.today())
+        self.pages = {}
+        self.failed = set()
+        self.last_page = None
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        # The table changes from one day to the next, so only same-day pages are reused
+        if state.get("date") != self.today:
+            logging.info(f"Discarding checkpoint {self.path} from {state.get('date')}")
+            return
+        self.pages = {int(number): records for number, records in state["pages"].items()}
+        self.failed = set(state["failed"])
+        self.last_page = state["last_page"]
+        logging.info(f"Resuming from checkpoint {self.path}: {len(self.pages)} pages done, next page {self.next_page()}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = {"date": self.today, "pages": self.pages, "failed": sorted(self.failed), "last_page": self.last_page}
+        with open(f"{self.path}.partial", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(f"{self.path}.partial", self.path)
+
+    def record(self, number, records, has_next):
+        self.pages[number] = records
+        self.failed.discard(number)
+        if not has_next:
+            self.last_page = number
+        self.save()
+
+    def fail(self, number):
+        self.failed.add(number)
+        self.save()
+
+    def next_page(self, after=0):
+        """First page after `after` that still has to be scraped, or None when done"""
+        number = after + 1
+        while number in self.pages:
+            number += 1
+        if self.last_page is not None and number > self.last_page:
+            return None
+        return number
+
+    def complete(self):
+        return self.last_page is not None and all(n in self.pages for n in range(1, self.last_page + 1))
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def valid_record(record):
+    """A record with a player name, a team and finite, non-negative metrics"""
+    for key, value in record.items():
+        if key in ("Player", "Team"):
+            if not isinstance(value, str) or not value.strip():
+                return False
+        elif not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+            return False
+    return record.get("Minutes", 1) > 0
+
+def merge_pages(pages):
+    """Valid records in page order, keeping each player's first occurrence"""
+    merged, seen, rejected = [], set(), 0
+    for number in sorted(pages):
+        for record in pages[number]:
+            if not valid_record(record):
+                rejected += 1
+                continue
+            if record["Player"] in seen:
+                continue
+            seen.add(record["Player"])
+            merged.append(record)
+    if rejected:
+        logging.warning(f"Dropped {rejected} invalid rows")
+    return merged
+
+def goto_table_page(page, current, target):
+    """Click through the pagination links from the current table page to the target one"""
+    while current != target:
+        links = [int(text) for text in page.locator(PAGE_LINKS).all_inner_texts() if text.strip().isdigit()]
+        if target in links:
+            step = target
+        else:
+            # Jump as far as the visible links allow
+            step = max((n for n in links if current < n < target), default=None)
+            if step is None:
+                raise RuntimeError(f"No link towards page {target} from page {current}")
+        rerender(page, page.locator(PAGE_LINKS).get_by_text(f"{step}", exact=True).click)
+        current = step
+    return current
+
+def paginate(page, parse_row, checkpoint, max_pages=50, retries=3, backoff=2.0):
+    """Scrape every table page the checkpoint is missing; returns the merged rows, or None
+    when some pages are still outstanding"""
+    current = 1
+    number = checkpoint.next_page()
+    while number is not None and number <= max_pages:
+        for attempt in range(retries + 1):
+            try:
+                with metrics.timer("page", table=checkpoint.name):
+                    current = goto_table_page(page, current, number)
+                    rows = extract_rows(page)
+                    if not rows:
+                        raise RuntimeError("no rows rendered")
+                    has_next = page.locator(PAGE_LINKS).get_by_text(f"{number + 1}", exact=True).count() > 0
+                    checkpoint.record(number, parse_rows(rows, parse_row), has_next)
+                metrics.count("pages", table=checkpoint.name)
+                logging.info(f"Scraped page {number}")
+                break
+            except Exception as e:
+                if attempt == retries:
+                    logging.error(f"Giving up on page {number} after {retries + 1} attempts: {e}")
+                    metrics.count("failed_pages", table=checkpoint.name)
+                    checkpoint.fail(number)
+                    break
+                delay = backoff * 2 ** attempt
+                metrics.count("retries", table=checkpoint.name)
+                logging.warning(f"Page {number} failed ({e}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+                # Let a half-finished re-render settle before trying again from where it is
+                try:
+                    page.wait_for_selector(PLAYER_ROWS, timeout=10000)
+                except Exception:
+                    pass
+        if number in checkpoint.failed:
+            # Most likely throttled; the rest of the pages wait for the next run
+            break
+        number = checkpoint.next_page(number)
+
+    if not checkpoint.complete():
+        logging.error(f"Table scrape incomplete after {len(checkpoint.pages)} pages; rerun to resume from {checkpoint.path}")
+        return None
+    players = merge_pages(checkpoint.pages)
+    checkpoint.clear()
+    return players
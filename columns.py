@@ -0,0 +1,5 @@
+# Column layouts of the scraped datasets, kept free of the scraper's imports so the
+# loaders and the app can use them without pulling in Playwright.
+SEASON_COLUMNS = ["Player", "Team", "Minutes", "NpGI90", "xA90", "NPxG90_xA90", "xGChain90", "xGBuildup90"]
+FORM_COLUMNS = ["Player", "Team", "xA90", "NPxG90_xA90", "xGChain90", "xGBuildup90"]
+MATCH_COLUMNS = ["player_id", "match_id", "date", "season", "time", "npg", "assists", "npxG", "xA", "xGChain", "xGBuildup"]
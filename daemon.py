@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+import schedule
+from playwright.sync_api import sync_playwright
+import db
+import matches
+import metrics
+import player_stat1
+import playwrit
+from artifact import write_artifact
+from datasets import save_dataset
+from refresh_state import STATE_PATH, read_state, write_state
+from run_daily import collect_datasets
+from understat import LEAGUE_URL, parse_dates_data, parse_players_data
+
+# Long-running refresh: one warm browser, and a cheap poll of the league page source (no
+# rendering) for newly finished matches. Only when the results change are the datasets
+# scraped, and only the ones whose content moved are rewritten. The state file (see
+# refresh_state.py) doubles as the app's refresh stamp.
+DATASETS = {
+    "season_stats": (player_stat1.CSV_FILE_PATH, player_stat1.COLUMNS),
+    "form_stats": (playwrit.CSV_FILE_PATH, playwrit.COLUMNS)
+}
+
+def results_signature(html):
+    """(finished matches, digest) of the league's results so far, or None if the page has no data.
+    Uses the fixture list when the page ships one, otherwise every player's appearances and minutes."""
+    dates = parse_dates_data(html)
+    if dates is not None:
+        finished = sorted(str(match["id"]) for match in dates if match.get("isResult"))
+        return len(finished), hashlib.sha1(",".join(finished).encode()).hexdigest()[:16]
+    players = parse_players_data(html)
+    if not players:
+        return None
+    totals = sorted(f"{p['id']}:{p['games']}:{p['time']}" for p in players)
+    return sum(int(p["games"]) for p in players), hashlib.sha1(",".join(totals).encode()).hexdigest()[:16]
+
+def dataset_changed(path, columns, records):
+    """Whether saving the records would change the CSV on disk"""
+    if not os.path.exists(path):
+        return True
+    with open(path, encoding="utf-8") as f:
+        return f.read() != pd.DataFrame(records, columns=columns).to_csv(index=False)
+
+class RefreshDaemon:
+    """Polls for finished matches and refreshes the affected datasets with a warm browser"""
+
+    def __init__(self, playwright, mode="data", with_matches=False, state_path=STATE_PATH):
+        self.playwright = playwright
+        self.mode = mode
+        self.with_matches = with_matches
+        self.state_path = state_path
+        self.state = read_state(state_path)
+        self.http = playwright.request.new_context()
+        self.browser = None
+
+    def warm_browser(self):
+        """The running browser, relaunched if it has crashed or was never started"""
+        if self.browser is None or not self.browser.is_connected():
+            logging.info("Launching browser")
+            self.browser = self.playwright.chromium.launch(headless=True)
+        return self.browser
+
+    def poll(self):
+        """Current results signature from the raw league page"""
+        response = self.http.get(LEAGUE_URL, timeout=30000)
+        if not response.ok:
+            raise RuntimeError(f"{LEAGUE_URL} returned {response.status}")
+        return results_signature(response.text())
+
+    def check(self):
+        """One results check, recorded as a run in the metrics"""
+        with metrics.run("refresh_daemon"):
+            self.check_results()
+
+    def check_results(self):
+        try:
+            with metrics.timer("poll"):
+                signature = self.poll()
+        except Exception as e:
+            logging.warning(f"Results check failed: {e}")
+            return
+        if signature is None:
+            logging.warning("League page has no player data yet")
+            return
+        finished, digest = signature
+        if digest == self.state.get("signature"):
+            logging.info(f"No new results ({finished} so far)")
+            return
+        logging.info(f"Results changed ({self.state.get('finished')} -> {finished}), refreshing")
+        try:
+            changed, complete = self.refresh()
+        except Exception as e:
+            logging.error(f"Refresh failed: {e}", exc_info=True)
+            metrics.count("errors")
+            return
+
+        self.state["checked_at"] = datetime.now().isoformat(timespec="seconds")
+        # A partial refresh leaves the old signature, so the next check tries again
+        if complete:
+            self.state.update(signature=digest, finished=finished)
+        if changed:
+            self.state.update(version=self.state.get("version", 0) + 1, datasets=changed,
+                              refreshed_at=self.state["checked_at"])
+        write_state(self.state, self.state_path)
+
+    def refresh(self):
+        """Scrape both datasets and save the ones that changed; returns their names and
+        whether every dataset was scraped"""
+        records = dict(zip(DATASETS, collect_datasets(self.warm_browser(), self.mode)))
+        changed = {}
+        complete = all(records.values())
+        for dataset, (path, columns) in DATASETS.items():
+            if not records[dataset]:
+                logging.error(f"No {dataset} scraped, keeping {path}")
+            elif not dataset_changed(path, columns, records[dataset]):
+                logging.info(f"{dataset} unchanged")
+            elif save_dataset(dataset, records[dataset]):
+                changed[dataset] = records[dataset]
+        metrics.count("refreshes")
+        metrics.count("changed_datasets", len(changed))
+        if changed and db.DATABASE_URL:
+            with metrics.timer("db_load"):
+                db.load_run(changed)
+        if self.with_matches:
+            try:
+                # The sync API keeps an event loop on this thread, so the async ingest gets its own
+                with metrics.timer("matches"), ThreadPoolExecutor(1) as executor:
+                    executor.submit(asyncio.run, matches.ingest()).result()
+            except Exception as e:
+                logging.warning(f"Match ingest failed: {e}")
+        if changed or self.with_matches:
+            try:
+                with metrics.timer("artifact"):
+                    write_artifact()
+            except Exception as e:
+                logging.warning(f"Could not write the model artifact: {e}")
+        return list(changed), complete
+
+    def close(self):
+        self.http.dispose()
+        if self.browser:
+            self.browser.close()
+
+if __name__ == "__main__":
+    # Setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f'refresh_daemon_{datetime.now().strftime("%Y%m%d")}.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Keep the scraped datasets current as matches finish")
+    parser.add_argument("--interval", type=int, default=15, help="minutes between results checks")
+    parser.add_argument("--mode", choices=["data", "dom"], default="data",
+                        help="data reads the player datasets shipped with the page, dom paginates the tables")
+    parser.add_argument("--matches", action="store_true", help="also ingest per-match data after a refresh")
+    args = parser.parse_args()
+
+    with sync_playwright() as playwright:
+        daemon = RefreshDaemon(playwright, args.mode, args.matches)
+        try:
+            daemon.check()
+            schedule.every(args.interval).minutes.do(daemon.check)
+            while True:
+                schedule.run_pending()
+                time.sleep(max(1, min(60, schedule.idle_seconds() or 60)))
+        except KeyboardInterrupt:
+            logging.info("Stopping refresh daemon")
+        finally:
+            daemon.close()
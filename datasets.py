@@ -0,0 +1,51 @@
+import logging
+import os
+import pandas as pd
+import metrics
+from columns import FORM_COLUMNS, SEASON_COLUMNS
+from sidecar import write_sidecar
+from snapshots import append_snapshot
+from understat import is_app_season, partition_path
+
+# Where every scraper saves a dataset. The app's CSVs hold the current EPL season and each
+# write also refreshes their sidecar and snapshot history; a scrape of any other league or
+# season goes to its own partition and never touches the app's data.
+CSV_PATHS = {"season_stats": "data/season_stats.csv", "form_stats": "data/form_stats.csv"}
+COLUMNS = {"season_stats": SEASON_COLUMNS, "form_stats": FORM_COLUMNS}
+
+def dataset_path(dataset, league="EPL", season=None):
+    """CSV that a scrape of a dataset for a league and season is saved to"""
+    if is_app_season(league, season):
+        return CSV_PATHS[dataset]
+    return partition_path(dataset, league, season)
+
+def save_dataset(dataset, records, league="EPL", season=None):
+    """Save scraped records to their CSV, and for the app's season its sidecar and snapshot"""
+    if not records:
+        logging.warning(f"No {dataset} data to save!")
+        return False
+    df = pd.DataFrame(records, columns=COLUMNS[dataset])
+    path = dataset_path(dataset, league, season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with metrics.timer("write_csv", dataset=dataset):
+        df.to_csv(path, index=False)
+    logging.info(f"Saved {len(df)} records to {path}")
+    if is_app_season(league, season):
+        record_dataset(dataset, df)
+    return True
+
+def record_dataset(dataset, df=None):
+    """Sidecar and snapshot of an app CSV that was just written, read back from it when no
+    frame is given. Both are best effort; the CSV the app falls back to is already written."""
+    path = CSV_PATHS[dataset]
+    df = pd.read_csv(path) if df is None else df
+    try:
+        with metrics.timer("write_sidecar", dataset=dataset):
+            write_sidecar(path, df)
+    except Exception as e:
+        logging.warning(f"Could not write {dataset} sidecar: {e}")
+    try:
+        with metrics.timer("write_snapshot", dataset=dataset):
+            append_snapshot(dataset, df)
+    except Exception as e:
+        logging.warning(f"Could not store {dataset} snapshot: {e}")
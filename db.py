@@ -0,0 +1,176 @@
+import argparse
+import io
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date
+import pandas as pd
+from columns import FORM_COLUMNS, SEASON_COLUMNS
+from search_index import fold
+
+# PostgreSQL storage for the scraped datasets. Each scraper run is bulk-loaded with COPY into
+# temporary staging tables and upserted in a single transaction, keyed by snapshot date and a
+# stable player key (the accent-folded player name). Point DATABASE_URL at any Postgres
+# instance, e.g. postgresql://localhost/fpl, then run `python db.py init` and `python db.py load`.
+DATABASE_URL = os.environ.get("DATABASE_URL")
+# Player names are not ASCII, so never fall back to the server's default client encoding
+CONNECT_OPTIONS = {"client_encoding": "UTF8"}
+
+COLUMNS = {"season_stats": SEASON_COLUMNS, "form_stats": FORM_COLUMNS}
+# Metric columns are stored under their lowercased CSV names
+COLUMN_TYPES = {"Player": "text NOT NULL", "Team": "text NOT NULL", "Minutes": "integer"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS loads (
+    id bigserial PRIMARY KEY,
+    dataset text NOT NULL,
+    snapshot_date date NOT NULL,
+    row_count integer NOT NULL,
+    loaded_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS loads_dataset_idx ON loads (dataset, id);
+"""
+
+def table_schema(dataset):
+    """DDL for one dataset table and its player, team and snapshot date indexes"""
+    columns = ",\n    ".join(f"{col.lower()} {COLUMN_TYPES.get(col, 'double precision')}" for col in COLUMNS[dataset])
+    return f"""
+CREATE TABLE IF NOT EXISTS {dataset} (
+    snapshot_date date NOT NULL,
+    player_key text NOT NULL,
+    {columns},
+    PRIMARY KEY (snapshot_date, player_key)
+);
+CREATE INDEX IF NOT EXISTS {dataset}_player_idx ON {dataset} (player_key, snapshot_date);
+CREATE INDEX IF NOT EXISTS {dataset}_team_idx ON {dataset} (team, snapshot_date);
+CREATE INDEX IF NOT EXISTS {dataset}_snapshot_idx ON {dataset} (snapshot_date DESC);
+"""
+
+def create_schema(conn):
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA)
+        for dataset in COLUMNS:
+            cur.execute(table_schema(dataset))
+
+def _staged_frame(dataset, records, snapshot_date):
+    """Rows in table column order, one per player key (first occurrence wins, as in the app)"""
+    df = pd.DataFrame(records, columns=COLUMNS[dataset])
+    df.insert(0, "player_key", df["Player"].map(fold))
+    df.insert(0, "snapshot_date", str(snapshot_date))
+    if "Minutes" in df:
+        df["Minutes"] = df["Minutes"].round().astype("Int64")
+    return df.drop_duplicates(subset=["player_key"], keep="first")
+
+def copy_upsert(cur, dataset, records, snapshot_date):
+    """COPY records into a staging table and upsert them into the dataset table"""
+    from psycopg2 import sql
+    df = _staged_frame(dataset, records, snapshot_date)
+    columns = [sql.Identifier(col.lower()) for col in df.columns]
+    staging = sql.Identifier(f"staging_{dataset}")
+    table = sql.Identifier(dataset)
+
+    cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(staging, table))
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_expert(sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(staging, sql.SQL(", ").join(columns)).as_string(cur), buffer)
+
+    updates = sql.SQL(", ").join(sql.SQL("{0} = EXCLUDED.{0}").format(col) for col in columns[2:])
+    cur.execute(sql.SQL("""
+        INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging}
+        ON CONFLICT (snapshot_date, player_key) DO UPDATE SET {updates}
+    """).format(table=table, columns=sql.SQL(", ").join(columns), staging=staging, updates=updates))
+    # A run replaces the day's snapshot, so players missing from it are removed
+    cur.execute(sql.SQL("""
+        DELETE FROM {table} t WHERE t.snapshot_date = %s
+        AND NOT EXISTS (SELECT 1 FROM {staging} s WHERE s.player_key = t.player_key)
+    """).format(table=table, staging=staging), (str(snapshot_date),))
+    cur.execute("INSERT INTO loads (dataset, snapshot_date, row_count) VALUES (%s, %s, %s)",
+                (dataset, str(snapshot_date), len(df)))
+    return len(df)
+
+def load_run(datasets, snapshot_date=None, dsn=None):
+    """Load one scraper run ({dataset: records or DataFrame}) in a single transaction"""
+    import psycopg2
+    snapshot_date = snapshot_date or date.today()
+    conn = psycopg2.connect(dsn or DATABASE_URL, **CONNECT_OPTIONS)
+    try:
+        # The connection context manager commits on success and rolls back on any error
+        with conn, conn.cursor() as cur:
+            create_schema(conn)
+            for dataset, records in datasets.items():
+                if records is None or len(records) == 0:
+                    logging.warning(f"No {dataset} rows to load")
+                    continue
+                count = copy_upsert(cur, dataset, records, snapshot_date)
+                logging.info(f"Loaded {count} {dataset} rows for {snapshot_date}")
+    finally:
+        conn.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool(dsn=None, minconn=1, maxconn=8):
+    """Process-wide connection pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from psycopg2.pool import ThreadedConnectionPool
+            _pool = ThreadedConnectionPool(minconn, maxconn, dsn or DATABASE_URL, **CONNECT_OPTIONS)
+    return _pool
+
+@contextmanager
+def connection(pool=None):
+    """Borrow a pooled connection for read-only work"""
+    pool = pool or get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        # End the read transaction so the connection goes back idle
+        conn.rollback()
+        pool.putconn(conn)
+
+def dataset_version(dataset, pool=None):
+    """Id of the latest load of a dataset; changes whenever new data is loaded"""
+    with connection(pool) as conn, conn.cursor() as cur:
+        cur.execute("SELECT max(id) FROM loads WHERE dataset = %s", (dataset,))
+        return cur.fetchone()[0]
+
+def read_dataset(dataset, snapshot_date=None, pool=None):
+    """The dataset as of a snapshot date (default: the latest), with the CSV column names"""
+    from psycopg2 import sql
+    table = sql.Identifier(dataset)
+    columns = sql.SQL(", ").join(sql.SQL("{} AS {}").format(sql.Identifier(col.lower()), sql.Identifier(col)) for col in COLUMNS[dataset])
+    query = sql.SQL("""
+        SELECT {columns} FROM {table}
+        WHERE snapshot_date = (SELECT max(snapshot_date) FROM {table} WHERE snapshot_date <= %s)
+        ORDER BY player_key
+    """).format(columns=columns, table=table)
+    with connection(pool) as conn, conn.cursor() as cur:
+        cur.execute(query, (str(snapshot_date or date.max),))
+        return pd.DataFrame(cur.fetchall(), columns=COLUMNS[dataset])
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Manage the PostgreSQL copy of the scraped datasets")
+    parser.add_argument("command", choices=["init", "load"], help="init creates the schema, load bulk-loads the CSVs")
+    parser.add_argument("--dsn", default=DATABASE_URL, help="connection string (default: $DATABASE_URL)")
+    parser.add_argument("--date", default=None, help="snapshot date for load (default: today)")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set DATABASE_URL or pass --dsn")
+
+    if args.command == "init":
+        import psycopg2
+        conn = psycopg2.connect(args.dsn, **CONNECT_OPTIONS)
+        try:
+            with conn:
+                create_schema(conn)
+        finally:
+            conn.close()
+        logging.info("Schema ready")
+    else:
+        load_run({dataset: pd.read_csv(f"data/{dataset}.csv") for dataset in COLUMNS}, args.date, args.dsn)
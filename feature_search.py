@@ -0,0 +1,113 @@
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from model import PREDICTORS, add_features, apply_capping
+from threshold_sweep import caps_at, sweep
+
+# Cross-validated search over every subset of the season model's candidate predictors.
+# Within a fold every candidate's weighted normal equations are sub-blocks of one Gram matrix
+# over all candidates, so each fold costs one pass over the data plus a batched solve per
+# subset size. Folds run in parallel across processes.
+SEASON_PATH = "data/season_stats.csv"
+TARGET = 'NpGI90'
+WEIGHT = 'Minutes'
+CANDIDATES = ['xA90', 'npxG90', 'NPxG90_xA90', 'xGChain90', 'xGBuildup90', 'xGChain_xGBuildup', 'SP_Chain_Buildup']
+
+def prepare(season_df, threshold_pct=0.6):
+    """Capped season data with every candidate feature, as the app models it"""
+    caps = caps_at(sweep(season_df), round(threshold_pct * 100))
+    df = add_features(apply_capping(season_df, caps).copy())
+    df['npxG90'] = df['NPxG90_xA90'] - df['xA90']
+    return df
+
+def candidate_subsets(n_candidates, max_features=None):
+    """Index tuples of every non-empty subset, smallest first"""
+    max_features = max_features or n_candidates
+    return [s for k in range(1, max_features + 1) for s in combinations(range(n_candidates), k)]
+
+def fold_ids(n, folds, repeats=1, seed=0):
+    """Fold assignment of each row for each repeat of k-fold cross-validation"""
+    rng = np.random.default_rng(seed)
+    return [rng.permutation(np.arange(n) % folds) for _ in range(repeats)]
+
+def _score_fold(args):
+    """Weighted squared error and weighted total sum of squares on one held-out fold per subset"""
+    X, y, w, test, subsets = args
+    train = ~test
+    Xw = X[train] * w[train, None]
+    gram = X[train].T @ Xw
+    moment = Xw.T @ y[train]
+    y_mean = (w[train] @ y[train]) / w[train].sum()
+
+    sse = np.empty(len(subsets))
+    by_size = {}
+    for i, subset in enumerate(subsets):
+        by_size.setdefault(len(subset), []).append(i)
+    for size, members in by_size.items():
+        # Column 0 is the constant, which every candidate model keeps
+        cols = np.array([(0,) + tuple(c + 1 for c in subsets[i]) for i in members])
+        beta = np.einsum('mij,mj->mi', np.linalg.pinv(gram[cols[:, :, None], cols[:, None, :]]), moment[cols])
+        predictions = np.einsum('nmk,mk->mn', X[test][:, cols], beta)
+        sse[members] = ((y[test] - predictions)**2 * w[test]).sum(axis=1)
+    sst = (w[test] * (y[test] - y_mean)**2).sum()
+    return sse, sst, w[test].sum()
+
+def search(df, candidates=CANDIDATES, folds=5, repeats=3, seed=0, max_features=None, workers=None):
+    """Leaderboard of every candidate subset by cross-validated, minutes-weighted error"""
+    X = np.column_stack([np.ones(len(df))] + [df[c].to_numpy(float) for c in candidates])
+    y = df[TARGET].to_numpy(float)
+    w = df[WEIGHT].to_numpy(float)
+    subsets = candidate_subsets(len(candidates), max_features)
+    tasks = [(X, y, w, assignment == fold, subsets) for assignment in fold_ids(len(df), folds, repeats, seed) for fold in range(folds)]
+
+    if workers and workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_score_fold, tasks))
+    else:
+        results = [_score_fold(task) for task in tasks]
+    sse = np.array([r[0] for r in results])
+    sst = np.array([r[1] for r in results])
+    weight = np.array([r[2] for r in results])
+
+    # Per-repeat totals over its folds, then mean and spread across repeats
+    per_repeat = lambda values: values.reshape(repeats, folds, *values.shape[1:]).sum(axis=1)
+    wmse = per_repeat(sse) / per_repeat(weight)[:, None]
+    r2 = 1 - per_repeat(sse) / per_repeat(sst)[:, None]
+    leaderboard = pd.DataFrame({
+        'features': [' + '.join(candidates[i] for i in s) for s in subsets],
+        'n_features': [len(s) for s in subsets],
+        'cv_rmse': np.sqrt(wmse.mean(axis=0)),
+        'cv_rmse_std': np.sqrt(wmse).std(axis=0),
+        'cv_r2': r2.mean(axis=0),
+        'current': [set(candidates[i] for i in s) == set(PREDICTORS) for s in subsets]
+    })
+    leaderboard = leaderboard.sort_values('cv_rmse', kind='mergesort').reset_index(drop=True)
+    leaderboard.index = pd.RangeIndex(1, len(leaderboard) + 1, name='rank')
+    return leaderboard
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Cross-validated search over season model feature subsets")
+    parser.add_argument("--threshold", type=float, default=60, help="season minutes threshold (%%) used for capping")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3, help="independent shuffles of the k folds")
+    parser.add_argument("--max-features", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="processes to spread the folds over")
+    parser.add_argument("--top", type=int, default=20, help="leaderboard rows to print")
+    parser.add_argument("--output", default=None, help="write the full leaderboard to this CSV")
+    args = parser.parse_args()
+
+    season_df = pd.read_csv(SEASON_PATH).drop_duplicates(subset=['Player'], keep='first')
+    df = prepare(season_df, args.threshold / 100)
+    logging.info(f"Searching {2 ** len(CANDIDATES) - 1} subsets over {len(df)} players, {args.folds}-fold x {args.repeats}")
+    leaderboard = search(df, folds=args.folds, repeats=args.repeats, max_features=args.max_features, workers=args.workers)
+    print(leaderboard.head(args.top).to_string())
+    current = leaderboard[leaderboard['current']]
+    if not current.empty:
+        print(f"\nCurrent model ({' + '.join(PREDICTORS)}) ranks {current.index[0]} of {len(leaderboard)}")
+    if args.output:
+        leaderboard.to_csv(args.output)
@@ -0,0 +1,110 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Replays saved understat pages so scraper timing can be measured offline
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "understat")
+
+def fixture_for(method, path, form):
+    """Map a request to the saved fixture file that answers it"""
+    if method == "GET" and path.startswith("/league/"):
+        # /league/EPL and /league/EPL/2024 both serve the league's saved page
+        league = path.strip("/").split("/")[1]
+        return f"league_{league}.html", "text/html; charset=utf-8"
+    if method == "GET" and path.startswith("/player/"):
+        return f"player_{path.strip('/').split('/')[1]}.html", "text/html; charset=utf-8"
+    if method == "POST" and path.rstrip("/") == "/main/getPlayersStats":
+        league = form.get("league", ["EPL"])[0]
+        last_matches = form.get("n_last_matches", ["5"])[0]
+        return f"players_stats_{league}_{last_matches}.json", "application/json"
+    return None, None
+
+def make_handler(directory, latency):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def respond(self, method):
+            url = urlparse(self.path)
+            form = {}
+            if method == "POST":
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            name, content_type = fixture_for(method, url.path, form)
+            path = os.path.join(directory, name) if name else None
+
+            time.sleep(latency)
+            if not path or not os.path.exists(path):
+                self.send_error(404)
+                return
+            with open(path, "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self.respond("GET")
+
+        def do_POST(self):
+            self.respond("POST")
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return FixtureHandler
+
+def serve(directory=FIXTURES_DIR, latency=0.0, port=0):
+    """Start the fixture server on a background thread and return it with its base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(directory, latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def time_script(script, args, base_url, workdir=None):
+    """Run a scraper script against the fixture server and time it, in `workdir` (kept, so
+    its output can be checked) or else a scratch directory"""
+    if workdir is None:
+        with tempfile.TemporaryDirectory() as scratch:
+            return time_script(script, args, base_url, scratch)
+    repo = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    env = dict(os.environ, UNDERSTAT_BASE_URL=base_url, PYTHONPATH=repo)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join(repo, script), *args], cwd=workdir, env=env)
+    return time.perf_counter() - started, result.returncode
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Serve saved understat pages with simulated latency")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before every response")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--time", nargs=argparse.REMAINDER, metavar="SCRIPT",
+                        help="run a scraper script (and its arguments) against the server and report its duration")
+    parser.add_argument("--budget", type=float, help="fail when the timed run takes longer than this many seconds")
+    args = parser.parse_args()
+
+    server, base_url = serve(latency=args.latency, port=args.port)
+    if not args.time:
+        logging.info(f"Serving {FIXTURES_DIR} at {base_url} (latency {args.latency}s); set UNDERSTAT_BASE_URL={base_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        server.shutdown()
+        sys.exit(0)
+
+    elapsed, returncode = time_script(args.time[0], args.time[1:], base_url)
+    server.shutdown()
+    logging.info(f"{' '.join(args.time)} finished in {elapsed:.2f}s with exit code {returncode}")
+    if returncode:
+        sys.exit(returncode)
+    if args.budget is not None and elapsed > args.budget:
+        logging.error(f"Scrape took {elapsed:.2f}s, over the {args.budget:.2f}s budget")
+        sys.exit(1)
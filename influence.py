@@ -0,0 +1,64 @@
+from collections import namedtuple
+import numpy as np
+
+# Influence diagnostics for (weighted) least-squares fits without forming the n x n hat matrix.
+# The weighted design is reduced to its p x p R factor chunk by chunk (TSQR), and leverage is read
+# off the rows of Xw V S^-1 from the SVD of R, so time is O(n p^2) and memory O(chunk_size p).
+Influence = namedtuple("Influence", ["hat_matrix_diag", "cooks_distance", "resid_studentized", "resid_studentized_external"])
+
+def _chunks(n, chunk_size):
+    for start in range(0, n, chunk_size):
+        yield slice(start, min(start + chunk_size, n))
+
+def r_factor(exog_weighted, chunk_size=50_000):
+    """R factor of the thin QR of a tall matrix, computed over row chunks"""
+    n, p = exog_weighted.shape
+    # A chunk of p rows or fewer reduces to itself, so the stacked factors would never shrink
+    chunk_size = max(chunk_size, p + 1)
+    factors = [np.linalg.qr(exog_weighted[rows], mode="r") for rows in _chunks(n, chunk_size)]
+    stacked = np.vstack(factors)
+    # Reduce the stacked R factors again until one p x p factor is left
+    while stacked.shape[0] > max(chunk_size, p):
+        stacked = np.vstack([np.linalg.qr(stacked[rows], mode="r") for rows in _chunks(stacked.shape[0], chunk_size)])
+    return np.linalg.qr(stacked, mode="r")
+
+def leverage(exog, weights=None, chunk_size=50_000, rcond=1e-12):
+    """Diagonal of the (weighted) hat matrix and the numerical rank of the design"""
+    exog = np.asarray(exog, dtype=float)
+    w_sqrt = np.ones(len(exog)) if weights is None else np.sqrt(np.asarray(weights, dtype=float))
+
+    # SVD of R gives the right singular vectors and singular values of the weighted design
+    _, s, vt = np.linalg.svd(r_factor(w_sqrt[:, None] * exog, chunk_size))
+    keep = s > rcond * s[0]
+    projection = vt[keep].T / s[keep]
+
+    hat = np.empty(len(exog))
+    for rows in _chunks(len(exog), chunk_size):
+        u_rows = (w_sqrt[rows, None] * exog[rows]) @ projection
+        hat[rows] = np.einsum("ij,ij->i", u_rows, u_rows)
+    return hat, int(keep.sum())
+
+def influence(exog, resid, weights=None, chunk_size=50_000):
+    """Leverage, Cook's distance and internally/externally studentized residuals"""
+    resid = np.asarray(resid, dtype=float)
+    hat, rank = leverage(exog, weights, chunk_size)
+    wresid = resid if weights is None else resid * np.sqrt(np.asarray(weights, dtype=float))
+
+    n = len(resid)
+    ssr = wresid @ wresid
+    mse = ssr / (n - rank)
+    one_minus_h = 1 - hat
+
+    cooks = wresid**2 / (rank * mse) * hat / one_minus_h**2
+    studentized = wresid / np.sqrt(mse * one_minus_h)
+    # Leave-one-out residual variance without refitting
+    mse_loo = (ssr - wresid**2 / one_minus_h) / (n - rank - 1)
+    external = wresid / np.sqrt(mse_loo * one_minus_h)
+    return Influence(hat, cooks, studentized, external)
+
+def model_influence(results, chunk_size=50_000):
+    """Influence diagnostics for a fitted statsmodels OLS or WLS results object"""
+    weights = getattr(results.model, "weights", None)
+    if np.isscalar(weights):
+        weights = None
+    return influence(results.model.exog, results.resid, weights, chunk_size)
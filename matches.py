@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from columns import FORM_COLUMNS, MATCH_COLUMNS
+from understat import (
+    LEAGUES, MATCH_DATA_ENDPOINT, MATCHES_DATA_SCRIPT, current_season,
+    league_url, match_record, matches_from_payload, parse_players, player_id_of, player_url
+)
+
+# Per-match player history, ingested once and extended incrementally. The league page's
+# playersData gives every player's appearance count, so after a gameweek only the players
+# whose count moved have their player page fetched again. Form over any window of recent
+# games or minutes is then computed locally from cumulative sums. The app only reads the
+# store, so the browser and the scraper are imported by the functions that fetch.
+# Every league and season ingested shares the store; form is read for one of them at a
+# time, by default the current EPL season the app ranks.
+MATCHES_PATH = "data/player_matches.parquet"
+STORE_COLUMNS = ["league", "player_id", "Player", "Team"] + MATCH_COLUMNS[1:]
+FORM_WINDOWS = (3, 5, 8)
+MIN_FORM_MINUTES = 180
+# Players with no appearance in any of their team's last few matches (injured, dropped or
+# sold) have no current form, however good their last window was
+RECENT_MATCHES = 3
+
+def load_matches(path=MATCHES_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=STORE_COLUMNS)
+    matches = pd.read_parquet(path)
+    if "league" not in matches:
+        # Stores written before the league column only held ingests of the default league
+        matches.insert(0, "league", "EPL")
+    return matches
+
+def save_matches(matches, path=MATCHES_PATH):
+    matches.to_parquet(f"{path}.partial", index=False)
+    os.replace(f"{path}.partial", path)
+
+def stale_players(players, stored, league, season):
+    """League entries whose appearance count differs from the matches already stored"""
+    counts = stored.loc[(stored["league"] == league) & (stored["season"] == season)].groupby("player_id").size()
+    return [p for p in players if int(p["games"]) != counts.get(int(p["id"]), 0)]
+
+class MatchCollector:
+    """run_jobs writer that keeps each player's fetched matches in memory"""
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, job, records):
+        self.records.extend(records)
+
+async def fetch_player_matches(context, job):
+    """Load a player page and read its per-match history"""
+    from async_scraper import page_dataset
+    matches = await page_dataset(context, job.url, MATCHES_DATA_SCRIPT,
+                                 lambda response: MATCH_DATA_ENDPOINT in response.url, matches_from_payload)
+    # matchesData entries carry no player id; the job's page is the player's
+    return parse_players(matches, match_record, player_id_of(job.url))
+
+def merge_matches(stored, records, players, league, season):
+    """The store extended with the fetched match records of a league season, named from the
+    league entries. Returns the merged store and the fetched rows."""
+    # Player pages list every season; keep the one being ingested
+    fetched = pd.DataFrame(records, columns=MATCH_COLUMNS)
+    fetched = fetched[fetched["season"] == season]
+    names = pd.DataFrame({
+        "player_id": [int(p["id"]) for p in players],
+        "Player": [p["player_name"] for p in players],
+        "Team": [p["team_title"] for p in players]
+    })
+    fetched = fetched.merge(names, on="player_id", how="left")
+    fetched["league"] = league
+    fetched = fetched[STORE_COLUMNS]
+
+    merged = pd.concat([stored, fetched], ignore_index=True) if len(stored) else fetched
+    merged = merged.drop_duplicates(subset=["player_id", "match_id"], keep="last")
+    merged = merged.sort_values(["player_id", "date", "match_id"], kind="mergesort").reset_index(drop=True)
+    return merged, fetched
+
+async def ingest(league="EPL", season=None, concurrency=4, rate=2, path=MATCHES_PATH):
+    """Fetch the matches of every player whose appearances changed and merge them into the store"""
+    from playwright.async_api import async_playwright
+    from async_scraper import HostRateLimiter, Job, league_players, run_jobs
+    season = season or current_season()
+    stored = load_matches(path)
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            context = await browser.new_context()
+            players = await league_players(context, league_url(league, season))
+            stale = stale_players(players, stored, league, season)
+            logging.info(f"{len(stale)} of {len(players)} players have new matches")
+
+            collector = MatchCollector()
+            jobs = [Job("player_matches", player_url(p["id"]), None, league, season) for p in stale]
+            await run_jobs(context, jobs, collector, concurrency, {"player_matches": fetch_player_matches}, HostRateLimiter(rate))
+        finally:
+            await browser.close()
+
+    merged, fetched = merge_matches(stored, collector.records, players, league, season)
+    save_matches(merged, path)
+    logging.info(f"Stored {len(fetched)} matches for {fetched['player_id'].nunique()} players ({len(merged)} in total)")
+    return len(fetched)
+
+def rolling_form(matches, games=None, minutes=None):
+    """Window totals ending at every match: the last `games` appearances, or the fewest
+    recent appearances that add up to at least `minutes`"""
+    matches = matches.sort_values(["player_id", "date", "match_id"], kind="mergesort").reset_index(drop=True)
+    n = len(matches)
+    player = matches["player_id"].to_numpy()
+    first = np.flatnonzero(np.r_[True, player[1:] != player[:-1]])
+    player_start = np.repeat(first, np.diff(np.r_[first, n]))
+    position = np.arange(n)
+
+    # Cumulative totals with a leading zero, so a window (start, end] sums to cum[end] - cum[start]
+    stats = ["time", "npg", "assists", "npxG", "xA", "xGChain", "xGBuildup"]
+    cum = np.vstack([np.zeros(len(stats)), np.cumsum(matches[stats].to_numpy(float), axis=0)])
+    if games is not None:
+        start = np.maximum(position + 1 - games, player_start)
+    else:
+        # Latest start whose window still reaches the minutes target; minutes never decrease
+        start = np.searchsorted(cum[:, 0], cum[position + 1, 0] - minutes, side="right") - 1
+        start = np.maximum(start, player_start)
+    totals = cum[position + 1] - cum[start]
+
+    window = matches[["player_id", "Player", "Team", "match_id", "date"]].copy()
+    window["games"] = position + 1 - start
+    for i, stat in enumerate(stats):
+        window[stat] = totals[:, i]
+    return window
+
+def recent_players(matches, recent=RECENT_MATCHES):
+    """Ids of the players who appeared in one of their team's last `recent` matches"""
+    team_matches = matches.drop_duplicates(["Team", "match_id"]).sort_values(["date", "match_id"], kind="mergesort")
+    latest = team_matches.groupby("Team").tail(recent)[["Team", "match_id"]]
+    return set(matches.merge(latest, on=["Team", "match_id"])["player_id"])
+
+def current_form(matches, games=None, minutes=None, as_of=None, min_minutes=MIN_FORM_MINUTES,
+                 league="EPL", season=None, recent=RECENT_MATCHES):
+    """form_stats-style rows for each player's latest window in a league season (the current
+    one, or the one in play at `as_of`), for players who still appear"""
+    if as_of is not None:
+        matches = matches[matches["date"] <= str(as_of)]
+    season = season or current_season(pd.Timestamp(as_of).date() if as_of is not None else None)
+    matches = matches[(matches["league"] == league) & (matches["season"] == season)]
+    window = rolling_form(matches, games, minutes).groupby("player_id").tail(1)
+    window = window[(window["time"] >= min_minutes) & window["player_id"].isin(recent_players(matches, recent))]
+
+    per90 = lambda values: (values * 90 / window["time"]).round(2)
+    form = pd.DataFrame({
+        "Player": window["Player"],
+        "Team": window["Team"],
+        "xA90": per90(window["xA"]),
+        "NPxG90_xA90": per90(window["npxG"] + window["xA"]),
+        "xGChain90": per90(window["xGChain"]),
+        "xGBuildup90": per90(window["xGBuildup"])
+    })
+    return form[FORM_COLUMNS].reset_index(drop=True)
+
+if __name__ == "__main__":
+    # Setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f'match_stats_{datetime.now().strftime("%Y%m%d")}.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Ingest per-match player data and compute rolling form")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fetch = commands.add_parser("ingest", help="fetch matches for players with new appearances")
+    fetch.add_argument("--league", choices=LEAGUES, default="EPL")
+    fetch.add_argument("--season", type=int, default=None, help="season start year (default: current season)")
+    fetch.add_argument("--concurrency", type=int, default=4, help="maximum player pages in flight")
+    fetch.add_argument("--rate", type=float, default=2, help="maximum player pages started per second")
+    form = commands.add_parser("form", help="print form over a window of recent games or minutes")
+    window = form.add_mutually_exclusive_group(required=True)
+    window.add_argument("--games", type=int)
+    window.add_argument("--minutes", type=int)
+    form.add_argument("--league", choices=LEAGUES, default="EPL")
+    form.add_argument("--season", type=int, default=None, help="season start year (default: current season)")
+    form.add_argument("--as-of", default=None, help="only use matches up to this date")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        asyncio.run(ingest(args.league, args.season, args.concurrency, args.rate))
+    else:
+        form = current_form(load_matches(), args.games, args.minutes, args.as_of, league=args.league, season=args.season)
+        print(form.to_string(index=False))
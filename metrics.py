@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# Phase timers and counters for the scrapers and the app, off unless FPL_METRICS_DIR is set.
+# A run (one scrape, one app rerun) buffers its events per thread and, when it ends, appends
+# them to <dir>/<job>.jsonl and rewrites <dir>/<job>.prom with the process's running totals
+# for the node_exporter textfile collector. Outside a run every call returns straight away.
+METRICS_DIR = os.environ.get("FPL_METRICS_DIR")
+PREFIX = "fpl"
+NULL_SPAN = nullcontext()
+
+_local = threading.local()
+_lock = threading.Lock()
+# {job: {(kind, name, labels): [count, total, last]}}, kept for the life of the process
+_totals = {}
+
+class Run:
+    """Events of one instrumented run"""
+
+    def __init__(self, job, directory):
+        self.job = job
+        self.directory = directory
+        self.id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.events = []
+
+    def add(self, kind, name, labels, value):
+        self.events.append((time.time(), kind, name, labels, value))
+
+class Span:
+    """Times a phase of the current run"""
+
+    def __init__(self, run, name, labels):
+        self.run = run
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.run.add("span", self.name, self.labels, time.perf_counter() - self.started)
+        return False
+
+def start_run(job, directory=None):
+    """Begin collecting for a job on this thread; does nothing when metrics are disabled"""
+    directory = directory or METRICS_DIR
+    if directory:
+        _local.run = Run(job, directory)
+
+def end_run(status="ok"):
+    """Finish this thread's run and write its events and the job's totals"""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+    _local.run = None
+    run.add("span", "total", (("status", status),), time.perf_counter() - run.started)
+    flush(run)
+
+@contextmanager
+def run(job, directory=None):
+    """Instrument a block as one run of a job"""
+    start_run(job, directory)
+    try:
+        yield
+    except Exception:
+        end_run("error")
+        raise
+    except BaseException:
+        # Ctrl-C, or a Streamlit rerun or stop cutting the script short
+        end_run("interrupted")
+        raise
+    end_run()
+
+def timer(name, **labels):
+    """Context manager timing a phase of the current run"""
+    current = getattr(_local, "run", None)
+    if current is None:
+        return NULL_SPAN
+    return Span(current, name, tuple(sorted(labels.items())))
+
+def count(name, value=1, **labels):
+    """Add to a counter of the current run"""
+    current = getattr(_local, "run", None)
+    if current is not None:
+        current.add("counter", name, tuple(sorted(labels.items())), value)
+
+def flush(run):
+    os.makedirs(run.directory, exist_ok=True)
+    lines = [json.dumps({
+        "ts": datetime.fromtimestamp(ts).isoformat(timespec="milliseconds"),
+        "job": run.job,
+        "run": run.id,
+        "type": kind,
+        "name": name,
+        "labels": dict(labels),
+        "seconds" if kind == "span" else "value": round(value, 6)
+    }) for ts, kind, name, labels, value in run.events]
+
+    with _lock:
+        totals = _totals.setdefault(run.job, {})
+        for _, kind, name, labels, value in run.events:
+            entry = totals.setdefault((kind, name, labels), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += value
+            entry[2] = value
+        text = prometheus_text(run.job, totals)
+        with open(os.path.join(run.directory, f"{run.job}.jsonl"), "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        path = os.path.join(run.directory, f"{run.job}.prom")
+        with open(f"{path}.partial", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(f"{path}.partial", path)
+
+def label_text(labels):
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+def prometheus_text(job, totals):
+    """Prometheus text exposition of a job's phase timings and counters"""
+    spans, counters = [], []
+    for (kind, name, labels), (n, total, last) in sorted(totals.items()):
+        labels = (("job", job), ("phase" if kind == "span" else "counter", name)) + labels
+        if kind == "span":
+            spans.append((label_text(labels), n, total, last))
+        else:
+            counters.append((name, label_text((("job", job),) + labels[2:]), total))
+
+    lines = [f"# HELP {PREFIX}_phase_seconds Time spent in each phase",
+             f"# TYPE {PREFIX}_phase_seconds summary"]
+    lines += [f"{PREFIX}_phase_seconds_sum{labels} {total:.6f}\n{PREFIX}_phase_seconds_count{labels} {n}"
+              for labels, n, total, _ in spans]
+    lines += [f"# HELP {PREFIX}_phase_last_seconds Duration of each phase the last time it ran",
+              f"# TYPE {PREFIX}_phase_last_seconds gauge"]
+    lines += [f"{PREFIX}_phase_last_seconds{labels} {last:.6f}" for labels, _, _, last in spans]
+    for name in sorted({name for name, _, _ in counters}):
+        lines += [f"# TYPE {PREFIX}_{name}_total counter"]
+        lines += [f"{PREFIX}_{name}_total{labels} {total:g}" for counter, labels, total in counters if counter == name]
+    lines += [f"# TYPE {PREFIX}_last_run_timestamp_seconds gauge",
+              f'{PREFIX}_last_run_timestamp_seconds{{job="{job}"}} {time.time():.0f}']
+    return "\n".join(lines) + "\n"
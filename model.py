@@ -0,0 +1,56 @@
+import logging
+import numpy as np
+
+# Modelling helpers shared by the Streamlit app and the offline tools
+PREDICTORS = ['xGChain_xGBuildup', 'SP_Chain_Buildup', 'xA90']
+CAP_COLUMNS = ['xA90', 'NPxG90_xA90', 'xGChain90', 'xGBuildup90']
+CAP_QUANTILE = 0.95
+MIN_QUALIFIED = 5
+
+def calculate_season_caps(season_df, threshold_pct, warn=logging.warning):
+    """Calculate capping thresholds from season data using dynamic threshold"""
+    if season_df.empty or threshold_pct <= 0:
+        return {}
+
+    max_minutes = season_df['Minutes'].max()
+    threshold = max_minutes * threshold_pct
+
+    eligible = season_df[season_df['Minutes'] >= threshold]
+    if len(eligible) < MIN_QUALIFIED:
+        warn(f"Not enough qualified players ({len(eligible)}) at {threshold_pct:.0%} threshold!")
+        return {}
+
+    return {col: eligible[col].quantile(CAP_QUANTILE) for col in CAP_COLUMNS}
+
+def apply_capping(df, caps):
+    """Apply capping to dataframe using pre-calculated caps"""
+    if not caps or df.empty:
+        return df
+
+    capped_df = df.copy()
+    for col, cap in caps.items():
+        if col in capped_df.columns:
+            capped_df[col] = np.minimum(capped_df[col], cap)
+    return capped_df
+
+def add_features(df):
+    """Add the derived model features and drop rows where they cannot be computed"""
+    df['xGChain_xGBuildup'] = df['xGChain90'] - df['xGBuildup90']
+    df['SP_Chain_Buildup'] = (df['NPxG90_xA90'] - df['xGChain_xGBuildup']) / df['NPxG90_xA90']
+    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    df.dropna(inplace=True)
+    return df
+
+def rank_form(form_df, caps):
+    """Form-model predictions (NPGI Per 90) and rankings, best first"""
+    capped_form = apply_capping(form_df, caps).copy()
+    capped_form['npxG90'] = capped_form['NPxG90_xA90'] - capped_form['xA90']
+    add_features(capped_form)
+
+    # Prediction model: least squares through the pseudo-inverse, as statsmodels' OLS fits it,
+    # so predictions (and ties between them) match the statsmodels fit bit for bit
+    X_form = np.column_stack([np.ones(len(capped_form)), capped_form[PREDICTORS].to_numpy(float)])
+    params = np.linalg.pinv(X_form) @ capped_form['NPxG90_xA90'].to_numpy(float)
+    capped_form['NPGI Per 90'] = X_form @ params
+    capped_form['Rank'] = capped_form['NPGI Per 90'].rank(ascending=False)
+    return capped_form.sort_values(by='Rank')
@@ -1,167 +1,111 @@
+import argparse
 import re
-import time
-import pandas as pd
-from playwright.sync_api import Playwright, sync_playwright, TimeoutError as PlaywrightTimeout
+from playwright.sync_api import Playwright, sync_playwright
 import logging
 from datetime import datetime
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f'season_stats_{datetime.now().strftime("%Y%m%d")}.log'),
-        logging.StreamHandler()
-    ]
+import metrics
+from checkpoint import PageCheckpoint, paginate
+from datasets import CSV_PATHS, save_dataset
+from understat import (
+    LEAGUES, SEASON_COLUMNS, apply_table_popup, capture_player_responses, current_season,
+    open_table_popup, parse_players, parse_season_row, read_players_data, rerender, league_url,
+    season_record, wait_for_players
 )
 
-def season_stats():
-    csv_file_path = "data/season_stats.csv"
-    columns = ["Player", "Team", "Minutes", "NpGI90", "xA90", "NPxG90_xA90", "xGChain90", "xGBuildup90"]
+CSV_FILE_PATH = CSV_PATHS["season_stats"]
+COLUMNS = SEASON_COLUMNS
+
+def scrape_table(page, league="EPL", season=None):
+    """Configure the table popup and paginate through the rendered rows"""
+    logging.info("Configuring table columns...")
+    with metrics.timer("configure", dataset="season_stats"):
+        open_table_popup(page)
+
+        # Configure columns (with error handling)
+        column_selectors = [
+            "#league-players > .table-popup > .table-popup-body > .table-options > div > .row-display > label",
+            "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(6) > .row-display > label",
+            "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(7) > .row-display > label",
+            "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(11) > .row-display > label",
+            "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(14) > .row-display > label",
+            "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(15) > .row-display > label",
+            "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(18) > .row-display > label",
+            "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(19) > .row-display > label",
+            "div:nth-child(20) > .row-display > label",
+            "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(9) > .row-display > label"
+        ]
+
+        for selector in column_selectors:
+            try:
+                page.locator(selector).first.click(timeout=2000)
+            except Exception as e:
+                logging.warning(f"Could not click selector {selector}: {e}")
+
+        apply_table_popup(page)
+
+        # Select "All games"
+        try:
+            page.locator("div").filter(has_text=re.compile(r"^All games$")).click(timeout=5000)
+            page.locator("li").filter(has_text="All games").click(timeout=5000)
+        except Exception as e:
+            logging.warning(f"Could not select 'All games': {e}")
+
+        rerender(page, page.locator("#players-filter").click)
+
+    # Parsed pages are checkpointed, so a failed run resumes from the page it stopped on
+    checkpoint = PageCheckpoint(f"season_stats_{league}_{season or current_season()}")
+    with metrics.timer("paginate", dataset="season_stats"):
+        return paginate(page, parse_season_row, checkpoint) or []
+
+def read_dataset(page, responses=()):
+    """Read the season dataset the league page ships to the browser"""
+    return parse_players(read_players_data(page, responses) or [], season_record)
+
+def scrape(page, mode="data", responses=(), league="EPL", season=None):
+    """Collect season records from a loaded league page"""
+    players = []
+    if mode == "data":
+        with metrics.timer("read_dataset", dataset="season_stats"):
+            players = read_dataset(page, responses)
+        if players:
+            logging.info(f"Read {len(players)} players from the embedded dataset")
+        else:
+            logging.warning("Player dataset not available, falling back to table pagination")
+
+    if not players:
+        players = scrape_table(page, league, season)
 
-    def save_to_csv(data):
-        if not data:
-            logging.warning("No data to save!")
-            return False
-        df = pd.DataFrame(data, columns=columns)
-        df.to_csv(csv_file_path, index=False)
-        logging.info(f"Saved {len(data)} records to {csv_file_path}")
-        return True
+    metrics.count("rows", len(players), dataset="season_stats")
+    logging.info(f"Total players scraped: {len(players)}")
+    return players
 
+def season_stats(mode="data", league="EPL", season=None):
     def run(playwright: Playwright) -> None:
         browser = None
         try:
-            browser = playwright.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
+            with metrics.timer("launch"):
+                browser = playwright.chromium.launch(headless=True)
+                context = browser.new_context()
+                page = context.new_page()
+            responses = capture_player_responses(page)
             
             logging.info("Navigating to understat.com...")
-            page.goto("https://understat.com/league/EPL", timeout=30000)
-            
-            # Wait for the table to load
-            logging.info("Waiting for player table...")
-            page.wait_for_selector("#league-players", timeout=15000)
-            
-            # Check if table has data
-            try:
-                page.wait_for_selector("#league-players > table > tbody > tr", timeout=10000)
-            except PlaywrightTimeout:
-                logging.error("No player data found in table - season may not have started yet")
+            with metrics.timer("navigate", dataset="season_stats"):
+                page.goto(league_url(league, season), timeout=30000)
+                ready = wait_for_players(page)
+            if not ready:
                 return
             
-            # Scroll and open settings
-            page.evaluate("document.querySelector('#league-players').scrollIntoView();")
-            time.sleep(1)
-            
-            logging.info("Configuring table columns...")
-            page.locator("#league-players").get_by_role("button").click()
-            time.sleep(1)
+            players = scrape(page, mode, responses, league, season)
             
-            # Configure columns (with error handling)
-            column_selectors = [
-                "#league-players > .table-popup > .table-popup-body > .table-options > div > .row-display > label",
-                "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(6) > .row-display > label",
-                "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(7) > .row-display > label",
-                "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(11) > .row-display > label",
-                "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(14) > .row-display > label",
-                "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(15) > .row-display > label",
-                "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(18) > .row-display > label",
-                "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(19) > .row-display > label",
-                "div:nth-child(20) > .row-display > label",
-                "#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(9) > .row-display > label"
-            ]
-            
-            for selector in column_selectors:
-                try:
-                    page.locator(selector).first.click(timeout=2000)
-                except Exception as e:
-                    logging.warning(f"Could not click selector {selector}: {e}")
-            
-            time.sleep(1)
-            page.locator("#league-players").get_by_text("Apply").click()
-            time.sleep(2)
-            
-            # Select "All games"
-            try:
-                page.locator("div").filter(has_text=re.compile(r"^All games$")).click(timeout=5000)
-                page.locator("li").filter(has_text="All games").click(timeout=5000)
-            except Exception as e:
-                logging.warning(f"Could not select 'All games': {e}")
-            
-            page.locator("#players-filter").click()
-            page.wait_for_timeout(3000)
-
-            # Scrape data
-            players = []
-            page_number = 1
-            max_pages = 50  # Safety limit
-            
-            while page_number <= max_pages:
-                logging.info(f"Scraping page {page_number}...")
-                
-                try:
-                    rows = page.locator("#league-players > table > tbody > tr")
-                    row_count = rows.count()
-                    
-                    if row_count == 0:
-                        logging.warning("No rows found on this page")
-                        break
-                    
-                    for i in range(row_count):
-                        try:
-                            row = rows.nth(i)
-                            player = row.locator("td:nth-child(1)").inner_text(timeout=3000).strip()
-                            
-                            if not player:
-                                continue
-                            
-                            team = row.locator("td:nth-child(2)").inner_text(timeout=3000).strip()
-                            minutes = int(row.locator("td:nth-child(4)").inner_text(timeout=3000))
-                            npg = float(row.locator("td:nth-child(5)").inner_text(timeout=3000))
-                            assists = float(row.locator("td:nth-child(6)").inner_text(timeout=3000))
-                            xA90 = float(row.locator("td:nth-child(8)").inner_text(timeout=3000))
-                            nPxG90xA90 = float(row.locator("td:nth-child(9)").inner_text(timeout=3000))
-                            xgchain90 = float(row.locator("td:nth-child(10)").inner_text(timeout=3000))
-                            xgbuildup90 = float(row.locator("td:nth-child(11)").inner_text(timeout=3000))
-                            
-                            players.append({
-                                "Player": player,
-                                "Team": team,
-                                "Minutes": minutes,
-                                "NpGI90": (npg + assists) * 90 / minutes if minutes > 0 else 0,
-                                "xA90": xA90,
-                                "NPxG90_xA90": nPxG90xA90,
-                                "xGChain90": xgchain90,
-                                "xGBuildup90": xgbuildup90
-                            })
-                        except Exception as e:
-                            logging.warning(f"Error parsing row {i}: {e}")
-                            continue
-                    
-                    # Try next page
-                    next_button = page.locator("#league-players a").get_by_text(f"{page_number + 1}", exact=True)
-                    if next_button.count() > 0:
-                        next_button.click()
-                        page.wait_for_selector("#league-players > table > tbody > tr", timeout=5000)
-                        time.sleep(1)
-                        page_number += 1
-                    else:
-                        logging.info("No more pages to scrape")
-                        break
-                        
-                except Exception as e:
-                    logging.error(f"Error on page {page_number}: {e}")
-                    break
-
-            logging.info(f"Total players scraped: {len(players)}")
-            
-            if save_to_csv(players):
+            if save_dataset("season_stats", players, league, season):
                 logging.info("Season stats saved successfully")
             else:
                 logging.error("Failed to save season stats")
 
         except Exception as e:
             logging.error(f"Fatal error in season_stats: {e}", exc_info=True)
+            metrics.count("errors", dataset="season_stats")
             # Take screenshot for debugging
             try:
                 page.screenshot(path=f"error_screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
@@ -172,12 +116,29 @@ def season_stats():
                 context.close()
                 browser.close()
 
-    with sync_playwright() as playwright:
+    with metrics.run("season_stats"), sync_playwright() as playwright:
         run(playwright)
 
 if __name__ == "__main__":
+    # Setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f'season_stats_{datetime.now().strftime("%Y%m%d")}.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Scrape understat season stats")
+    parser.add_argument("--mode", choices=["data", "dom"], default="data",
+                        help="data reads the player dataset shipped with the page, dom paginates the table")
+    parser.add_argument("--league", choices=LEAGUES, default="EPL")
+    parser.add_argument("--season", type=int, default=None, help="season start year (default: current season)")
+    args = parser.parse_args()
+
     logging.info("=" * 50)
     logging.info("Starting season stats scraper")
     logging.info("=" * 50)
-    season_stats()
+    season_stats(args.mode, args.league, args.season)
     logging.info("Season stats scraper completed")
\ No newline at end of file
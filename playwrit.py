@@ -1,152 +1,106 @@
+import argparse
 import re
-import time
-import pandas as pd
-from playwright.sync_api import Playwright, sync_playwright, TimeoutError as PlaywrightTimeout
+from playwright.sync_api import Playwright, sync_playwright
 import logging
 from datetime import datetime
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f'form_stats_{datetime.now().strftime("%Y%m%d")}.log'),
-        logging.StreamHandler()
-    ]
+import metrics
+from checkpoint import PageCheckpoint, paginate
+from datasets import CSV_PATHS, save_dataset
+from understat import (
+    FORM_COLUMNS, LEAGUES, apply_table_popup, current_season, fetch_form_data, form_record,
+    open_table_popup, parse_form_row, parse_players, rerender, league_url, wait_for_players
 )
 
-def form_stats():
-    csv_file_path = "data/form_stats.csv"
-    columns = ["Player", "Team", "xA90", "NPxG90_xA90", "xGChain90", "xGBuildup90"]
+CSV_FILE_PATH = CSV_PATHS["form_stats"]
+COLUMNS = FORM_COLUMNS
+
+def scrape_table(page, league="EPL", season=None):
+    """Configure the table popup and paginate through the rendered rows"""
+    logging.info("Configuring table for form stats...")
+    with metrics.timer("configure", dataset="form_stats"):
+        open_table_popup(page)
+
+        # Configure columns with minutes filter
+        try:
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div > .row-display > label").first.click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(6) > .row-display > label").click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(5) > .row-filter > input").first.click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(5) > .row-filter > input").first.fill("180")
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(8) > .row-display > label").click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(9) > .row-display > label").click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(11) > .row-display > label").click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(14) > .row-display > label").click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(15) > .row-display > label").click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(18) > .row-display > label").click()
+            page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(19) > .row-display > label").click()
+            page.locator("div:nth-child(20) > .row-display > label").click()
+        except Exception as e:
+            logging.warning(f"Error configuring columns: {e}")
+
+        apply_table_popup(page)
+
+        # Select "5 games"
+        try:
+            page.locator("div").filter(has_text=re.compile(r"^All games$")).click(timeout=5000)
+            page.locator("li").filter(has_text="5 games").click(timeout=5000)
+        except Exception as e:
+            logging.warning(f"Could not select '5 games': {e}")
+
+        rerender(page, page.locator("#players-filter").click)
+
+    # Parsed pages are checkpointed, so a failed run resumes from the page it stopped on
+    checkpoint = PageCheckpoint(f"form_stats_{league}_{season or current_season()}")
+    with metrics.timer("paginate", dataset="form_stats"):
+        return paginate(page, parse_form_row, checkpoint) or []
+
+def read_dataset(page, league="EPL", season=None):
+    """Read the 5 games dataset through the page's browser context"""
+    return parse_players(fetch_form_data(page, league, season) or [], form_record)
+
+def scrape(page, mode="data", league="EPL", season=None):
+    """Collect form records from a loaded league page"""
+    players = []
+    if mode == "data":
+        with metrics.timer("read_dataset", dataset="form_stats"):
+            players = read_dataset(page, league, season)
+        if players:
+            logging.info(f"Read {len(players)} players from the 5 games dataset")
+        else:
+            logging.warning("Player dataset not available, falling back to table pagination")
+
+    if not players:
+        players = scrape_table(page, league, season)
 
-    def save_to_csv(data):
-        if not data:
-            logging.warning("No data to save!")
-            return False
-        df = pd.DataFrame(data, columns=columns)
-        df.to_csv(csv_file_path, index=False)
-        logging.info(f"Saved {len(data)} records to {csv_file_path}")
-        return True
+    metrics.count("rows", len(players), dataset="form_stats")
+    logging.info(f"Total players scraped (form): {len(players)}")
+    return players
 
+def form_stats(mode="data", league="EPL", season=None):
     def run(playwright: Playwright) -> None:
         browser = None
         try:
-            browser = playwright.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
+            with metrics.timer("launch"):
+                browser = playwright.chromium.launch(headless=True)
+                context = browser.new_context()
+                page = context.new_page()
             
             logging.info("Navigating to understat.com for form stats...")
-            page.goto("https://understat.com/league/EPL", timeout=30000)
-            
-            logging.info("Waiting for player table...")
-            page.wait_for_selector("#league-players", timeout=15000)
-            
-            try:
-                page.wait_for_selector("#league-players > table > tbody > tr", timeout=10000)
-            except PlaywrightTimeout:
-                logging.error("No player data found - season may not have started")
+            with metrics.timer("navigate", dataset="form_stats"):
+                page.goto(league_url(league, season), timeout=30000)
+                ready = wait_for_players(page)
+            if not ready:
                 return
             
-            page.evaluate("document.querySelector('#league-players').scrollIntoView();")
-            time.sleep(1)
-            
-            logging.info("Configuring table for form stats...")
-            page.locator("#league-players").get_by_role("button").click()
-            time.sleep(1)
-            
-            # Configure columns with minutes filter
-            try:
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div > .row-display > label").first.click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(6) > .row-display > label").click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(5) > .row-filter > input").first.click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(5) > .row-filter > input").first.fill("180")
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(8) > .row-display > label").click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(9) > .row-display > label").click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(11) > .row-display > label").click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(14) > .row-display > label").click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(15) > .row-display > label").click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(18) > .row-display > label").click()
-                page.locator("#league-players > .table-popup > .table-popup-body > .table-options > div:nth-child(19) > .row-display > label").click()
-                page.locator("div:nth-child(20) > .row-display > label").click()
-            except Exception as e:
-                logging.warning(f"Error configuring columns: {e}")
-            
-            time.sleep(1)
-            page.locator("#league-players").get_by_text("Apply").click()
-            time.sleep(2)
+            players = scrape(page, mode, league, season)
             
-            # Select "5 games"
-            try:
-                page.locator("div").filter(has_text=re.compile(r"^All games$")).click(timeout=5000)
-                page.locator("li").filter(has_text="5 games").click(timeout=5000)
-            except Exception as e:
-                logging.warning(f"Could not select '5 games': {e}")
-            
-            page.locator("#players-filter").click()
-            page.wait_for_timeout(3000)
-
-            players = []
-            page_number = 1
-            max_pages = 50
-            
-            while page_number <= max_pages:
-                logging.info(f"Scraping form stats page {page_number}...")
-                
-                try:
-                    rows = page.locator("#league-players > table > tbody > tr")
-                    row_count = rows.count()
-                    
-                    if row_count == 0:
-                        break
-                    
-                    for i in range(row_count):
-                        try:
-                            row = rows.nth(i)
-                            player = row.locator("td:nth-child(1)").inner_text(timeout=3000).strip()
-                            
-                            if not player:
-                                continue
-                            
-                            team = row.locator("td:nth-child(2)").inner_text(timeout=3000).strip()
-                            xA90 = float(row.locator("td:nth-child(6)").inner_text(timeout=3000))
-                            nPxG90xA90 = float(row.locator("td:nth-child(7)").inner_text(timeout=3000))
-                            xgchain90 = float(row.locator("td:nth-child(8)").inner_text(timeout=3000))
-                            xgbuildup90 = float(row.locator("td:nth-child(9)").inner_text(timeout=3000))
-                            
-                            players.append({
-                                "Player": player,
-                                "xA90": xA90,
-                                "Team": team,
-                                "NPxG90_xA90": nPxG90xA90,
-                                "xGChain90": xgchain90,
-                                "xGBuildup90": xgbuildup90
-                            })
-                        except Exception as e:
-                            logging.warning(f"Error parsing row {i}: {e}")
-                            continue
-                    
-                    next_button = page.locator("#league-players a").get_by_text(f"{page_number + 1}", exact=True)
-                    if next_button.count() > 0:
-                        next_button.click()
-                        page.wait_for_selector("#league-players > table > tbody > tr", timeout=5000)
-                        time.sleep(1)
-                        page_number += 1
-                    else:
-                        break
-                        
-                except Exception as e:
-                    logging.error(f"Error on page {page_number}: {e}")
-                    break
-
-            logging.info(f"Total players scraped (form): {len(players)}")
-            
-            if save_to_csv(players):
+            if save_dataset("form_stats", players, league, season):
                 logging.info("Form stats saved successfully")
             else:
                 logging.error("Failed to save form stats")
 
         except Exception as e:
             logging.error(f"Fatal error in form_stats: {e}", exc_info=True)
+            metrics.count("errors", dataset="form_stats")
             try:
                 page.screenshot(path=f"error_screenshot_form_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
             except:
@@ -156,12 +110,29 @@ def form_stats():
                 context.close()
                 browser.close()
 
-    with sync_playwright() as playwright:
+    with metrics.run("form_stats"), sync_playwright() as playwright:
         run(playwright)
 
 if __name__ == "__main__":
+    # Setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f'form_stats_{datetime.now().strftime("%Y%m%d")}.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Scrape understat form stats")
+    parser.add_argument("--mode", choices=["data", "dom"], default="data",
+                        help="data reads the player dataset shipped with the page, dom paginates the table")
+    parser.add_argument("--league", choices=LEAGUES, default="EPL")
+    parser.add_argument("--season", type=int, default=None, help="season start year (default: current season)")
+    args = parser.parse_args()
+
     logging.info("=" * 50)
     logging.info("Starting form stats scraper")
     logging.info("=" * 50)
-    form_stats()
+    form_stats(args.mode, args.league, args.season)
     logging.info("Form stats scraper completed")
\ No newline at end of file
@@ -0,0 +1,18 @@
+import json
+import os
+
+# The refresh daemon's state file, which doubles as the app's refresh stamp: its version
+# changes after every refresh that rewrote data. Standard library only, so the app can
+# check it without importing the daemon's scrapers.
+STATE_PATH = "data/refresh_state.json"
+
+def read_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_state(state, path=STATE_PATH):
+    with open(f"{path}.partial", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.partial", path)
@@ -1,263 +1,493 @@
+import hashlib
+import io
+import os
 import pandas as pd
 import numpy as np
 import streamlit as st
-import statsmodels.api as sm
-import matplotlib.pyplot as plt
-import seaborn as sns
-from statsmodels.graphics.gofplots import qqplot
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-# Initialize session state for persistent storage
-if 'season_caps' not in st.session_state:
-    st.session_state.season_caps = {}
-
-def calculate_season_caps(season_df, threshold_pct):
-    """Calculate capping thresholds from season data using dynamic threshold"""
-    if season_df.empty or threshold_pct <= 0:
-        return {}
-    
-    max_minutes = season_df['Minutes'].max()
-    threshold = max_minutes * threshold_pct
-    
-    eligible = season_df[season_df['Minutes'] >= threshold]
-    if len(eligible) < 5:
-        st.warning(f"Not enough qualified players ({len(eligible)}) at {threshold_pct:.0%} threshold!")
-        return {}
-    
-    return {
-        'xA90': eligible['xA90'].quantile(0.95),
-        'NPxG90_xA90': eligible['NPxG90_xA90'].quantile(0.95),
-        'xGChain90': eligible['xGChain90'].quantile(0.95),
-        'xGBuildup90': eligible['xGBuildup90'].quantile(0.95)
-    }
-
-def apply_capping(df, caps):
-    """Apply capping to dataframe using pre-calculated caps"""
-    if not caps or df.empty:
-        return df
-    
-    capped_df = df.copy()
-    for col, cap in caps.items():
-        if col in capped_df.columns:
-            capped_df[col] = np.minimum(capped_df[col], cap)
-    return capped_df
-
-st.title('Goal Involvement OLS Model')
-tab1, tab2 = st.tabs(["NpGI90 Predictor", "Model Summary"])
-
-with tab2:
-    # Load season data
-    season_df = pd.read_csv("data/season_stats.csv").drop_duplicates(subset=['Player'], keep='first')
-    
-    # Dynamic threshold control
-    threshold_pct = st.slider(
-        'Season minutes threshold (%)', 
-        0, 100, 60,
-        format='%d%%',
-        help="Percentage of maximum season minutes required for uncapped stats"
-    ) / 100
-    
-    # Calculate and store capping thresholds
-    st.session_state.season_caps = calculate_season_caps(season_df, threshold_pct)
-    
-    if st.session_state.season_caps:
-        # Apply capping to season data
-        capped_season = apply_capping(season_df, st.session_state.season_caps)
-        
-        # Model preprocessing
-        capped_season['xGChain_xGBuildup'] = capped_season['xGChain90'] - capped_season['xGBuildup90']
-        capped_season['SP_Chain_Buildup'] = (capped_season['NPxG90_xA90'] - capped_season['xGChain_xGBuildup']) / capped_season['NPxG90_xA90']
-        capped_season.replace([np.inf, -np.inf], np.nan, inplace=True)
-        capped_season.dropna(inplace=True)
-
-        # Weighted model setup
-        y = capped_season['NpGI90']
-        X = sm.add_constant(capped_season[['xGChain_xGBuildup', 'SP_Chain_Buildup', 'xA90']])
-        model = sm.WLS(y, X, weights=capped_season['Minutes']).fit()
-        
-        # New Enhanced Model Diagnostics Section
-        st.subheader("Model Diagnostics")
-        
-        # Top Metrics Row
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("R-squared", f"{model.rsquared:.1%}", 
-                     help="Proportion of variance explained by model")
-        with col2:
-            st.metric("Adj. R-squared", f"{model.rsquared_adj:.1%}",
-                     help="R-squared adjusted for number of predictors")
-        with col3:
-            st.metric("F-statistic", f"{model.fvalue:.1f}",
-                     help="Overall significance of model")
-        with col4:
-            st.metric("AIC/BIC", f"{model.aic:.1f}/{model.bic:.1f}",
-                     help="Information criteria for model comparison")
-
-        # Assumption Checking Expandable Section
-        with st.expander("Regression Assumption Checks", expanded=True):
-            assumption_col1, assumption_col2, assumption_col3 = st.columns(3)
-            
-            # Normality Test
-            _, p_norm = sm.stats.diagnostic.normal_ad(model.resid)
-            assumption_col1.metric("Normality (p-value)", 
-                                  f"{p_norm:.4f}",
-                                  help="Jarque-Bera test of residual normality")
-            
-            # Heteroscedasticity Test
-            _, p_het, _, _ = sm.stats.diagnostic.het_breuschpagan(model.resid, model.model.exog)
-            assumption_col2.metric("Homoscedasticity (p-value)", 
-                                  f"{p_het:.4f}",
-                                  help="Breusch-Pagan test for constant variance")
-            
-            # Multicollinearity Check
-            vif_data = pd.DataFrame()
-            vif_data["Variable"] = X.columns
-            vif_data["VIF"] = [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
-            max_vif = vif_data["VIF"].max()
-            assumption_col3.metric("Max VIF", 
-                                  f"{max_vif:.1f}",
-                                  help="Variance Inflation Factor (VIF > 10 indicates multicollinearity)")
-        # Enhanced Variable Analysis Section
-        with st.expander("Detailed Variable Analysis", expanded=True):
-            # Coefficient Plot
-            plt.figure(figsize=(10, 4))
-            model.params[1:].plot(kind='barh')  # Exclude intercept
-            plt.title("Standardized Coefficient Magnitudes")
-            plt.xlabel("Effect Size")
-            st.pyplot(plt)
-            
-            # Partial Regression Plots
-            st.write("**Partial Regression Plots**")
-            fig = plt.figure(figsize=(15, 5))
-            sm.graphics.plot_partregress_grid(model, fig=fig)
-            st.pyplot(fig)
-
-        # Model Comparison Section
-        with st.expander("Model Comparison", expanded=False):
-            # Compare with unweighted model
-            simple_model = sm.OLS(y, X).fit()
-            comparison_df = pd.DataFrame({
-                'Weighted': [model.rsquared, model.aic, model.bic],
-                'Unweighted': [simple_model.rsquared, simple_model.aic, simple_model.bic]
-            }, index=['R-squared', 'AIC', 'BIC'])
-            st.dataframe(comparison_df.style.format("{:.2f}"), 
-                        use_container_width=True)
-
-        # Interactive Coefficient Explorer
-        with st.expander("Interactive Coefficient Exploration"):
-            selected_var = st.selectbox("Choose variable to explore:", 
-                                       model.params.index[1:])  # Exclude intercept
-            var_details = {
-                'Coefficient': model.params[selected_var],
-                'P-value': model.pvalues[selected_var],
-                'CI Lower': model.conf_int().loc[selected_var, 0],
-                'CI Upper': model.conf_int().loc[selected_var, 1]
-            }
-            st.json(var_details)
-            
-            # Individual residual plot
-            plt.figure(figsize=(10, 4))
-            sns.regplot(x=X[selected_var], y=model.resid, lowess=True)
-            plt.axhline(0, color='red', linestyle='--')
-            plt.title(f"Residuals vs {selected_var}")
-            st.pyplot(plt)
-
-        # Replace original plots with more informative versions
-        with st.expander("Advanced Diagnostics", expanded=False):
-            # Calculate leverage and Cook's distance manually
-            try:
-                # For OLS models
-                influence = model.get_influence()
-            except AttributeError:
-                # For WLS models
-                X = model.model.exog
-                w = model.model.weights  # Get weights from WLS model
-                w_sqrt = np.sqrt(w)
-                X_weighted = w_sqrt[:, None] * X
-                hat_matrix_diag = np.diag(X_weighted @ np.linalg.pinv(X_weighted.T @ X_weighted) @ X_weighted.T)
-                cooks = (model.resid**2 / (X.shape[1] * model.mse_resid)) * (hat_matrix_diag / (1 - hat_matrix_diag)**2)
+import metrics
+from artifact import (
+    DEFAULT_THRESHOLD, DEFAULT_WINDOW, FORM_PATH, RANKING_COLUMNS, SEASON_PATH, dataset_name, dataset_version,
+    file_version, read_artifact, read_version, source_key
+)
+from bootstrap import bootstrap_intervals
+from influence import model_influence
+from matches import FORM_WINDOWS, MATCHES_PATH, current_form, load_matches
+from model import PREDICTORS, add_features, apply_capping, rank_form
+from refresh_state import read_state
+from search_index import SearchIndex
+from squad import BUDGET, PRICES_PATH, attach_scores, load_prices, pick_squad, starting_xi
+from threshold_sweep import COEFFICIENTS, caps_at, sweep
+
+# statsmodels, matplotlib and seaborn take seconds to import, so only the Model Summary
+# functions that use them import them; a new session draws the rankings tab without them.
+
+# Controls live in lazily run tabs, so their values are kept in session state that outlives them
+for name, default in [("threshold", DEFAULT_THRESHOLD), ("form_window", DEFAULT_WINDOW), ("budget", BUDGET),
+                      ("locked", []), ("excluded", [])]:
+    st.session_state.setdefault(name, default)
+
+def keep(name):
+    """Widget callback copying the widget's value to its lasting session state key"""
+    st.session_state[name] = st.session_state[f"{name}_widget"]
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_dataset(path, version):
+    """Read a scraped dataset once per version"""
+    with metrics.timer("load", dataset=dataset_name(path)):
+        return read_version(path, version)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_source_key(path, version):
+    """Content hash of a dataset version, computed once per version"""
+    return source_key(path, version)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def get_artifact(season_source, form_source):
+    """The refresh job's precomputed start-up model for these datasets, or None"""
+    with metrics.timer("load", dataset="model_artifact"):
+        return read_artifact((season_source, form_source))
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def get_sweep(season_version):
+    """Caps and season fit statistics for every slider position, computed once per dataset version"""
+    return sweep(load_dataset(SEASON_PATH, season_version))
+
+def get_season_caps(season_version, threshold_pct):
+    """Season capping thresholds for a dataset version and slider position"""
+    return caps_at(get_sweep(season_version), round(threshold_pct * 100))
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def prepare_season(season_version, threshold_pct):
+    """Capped season data with the model features, dropping rows that cannot be modelled"""
+    season_df = load_dataset(SEASON_PATH, season_version)
+    return add_features(apply_capping(season_df, get_season_caps(season_version, threshold_pct)))
+
+# Fitted results are shared across sessions and must be treated as read-only
+@st.cache_resource(max_entries=16, show_spinner=False)
+def fit_season_model(season_version, threshold_pct):
+    """Minutes-weighted season model for a dataset version and threshold"""
+    import statsmodels.api as sm
+    capped_season = prepare_season(season_version, threshold_pct)
+    X = sm.add_constant(capped_season[PREDICTORS])
+    return sm.WLS(capped_season['NpGI90'], X, weights=capped_season['Minutes']).fit()
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def fit_unweighted_model(season_version, threshold_pct):
+    """Unweighted comparison model on the same capped season data"""
+    import statsmodels.api as sm
+    capped_season = prepare_season(season_version, threshold_pct)
+    return sm.OLS(capped_season['NpGI90'], sm.add_constant(capped_season[PREDICTORS])).fit()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_assumption_checks(season_version, threshold_pct):
+    """Normality, heteroscedasticity and multicollinearity checks for the season model"""
+    import statsmodels.api as sm
+    from statsmodels.stats.outliers_influence import variance_inflation_factor
+    model = fit_season_model(season_version, threshold_pct)
+    X = model.model.data.orig_exog
+    _, p_norm = sm.stats.diagnostic.normal_ad(model.resid)
+    _, p_het, _, _ = sm.stats.diagnostic.het_breuschpagan(model.resid, model.model.exog)
+    max_vif = max(variance_inflation_factor(X.values, i) for i in range(X.shape[1]))
+    return p_norm, p_het, max_vif
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_influence(season_version, threshold_pct):
+    """Leverage and Cook's distance for the season model"""
+    # Weighted fits have no get_influence; this works for both without the n x n hat matrix
+    influence = model_influence(fit_season_model(season_version, threshold_pct))
+    return influence.hat_matrix_diag, influence.cooks_distance
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_form(form_version, window):
+    """Form data: the scraped 5 games table, or a window of recent games from the match store"""
+    if window is None:
+        return load_dataset(FORM_PATH, form_version)
+    with metrics.timer("load", dataset="matches"):
+        return current_form(load_matches(MATCHES_PATH), games=window)
+
+# Caps are derived from the season dataset version and threshold, so they key the ranking too
+@st.cache_data(max_entries=16, show_spinner=False)
+def rank_form_players(form_version, caps, window=None):
+    """Form-model predictions and rankings for a form dataset version, season caps and form window"""
+    return rank_form(load_form(form_version, window), caps)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def rank_intervals(form_version, caps, window=None):
+    """90% bootstrap intervals for each ranked player's predicted NPGI Per 90 and rank"""
+    df_ranked = rank_form_players(form_version, caps, window)
+    X_form = np.column_stack([np.ones(len(df_ranked)), df_ranked[PREDICTORS].to_numpy(float)])
+    return bootstrap_intervals(X_form, df_ranked['NPxG90_xA90'], index=df_ranked.index)
+
+# The index positions follow the ranked frame, so it shares the ranking's cache key
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_search_index(form_version, caps, window=None):
+    """Accent-insensitive player/team search index over the ranked form table"""
+    df_ranked = rank_form_players(form_version, caps, window)
+    return SearchIndex(df_ranked['Player'], df_ranked['Team'])
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_squad_pool(form_version, caps, window, prices_version):
+    """Priced FPL player pool scored with the form rankings"""
+    return attach_scores(load_prices(PRICES_PATH), rank_form_players(form_version, caps, window))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def best_squad(form_version, caps, window, prices_version, budget, locked, excluded):
+    """Optimal squad and starting XI for a budget and sets of locked and excluded players"""
+    squad = pick_squad(get_squad_pool(form_version, caps, window, prices_version), budget, locked, excluded)
+    if squad is None:
+        return None, None
+    return squad, starting_xi(squad)
+
+def model_fingerprint(model):
+    """Identity of a fitted model's data and coefficients, used to key rendered figures"""
+    digest = hashlib.sha1(np.asarray(model.params).tobytes())
+    digest.update(np.ascontiguousarray(model.model.wexog).tobytes())
+    return digest.hexdigest()
+
+def figure_png(fig):
+    """Render a figure to PNG bytes and release it from pyplot"""
+    import matplotlib.pyplot as plt
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+# Figures are cached as image bytes; underscored arguments are not hashed, the fingerprint is the key
+@st.cache_data(max_entries=32, show_spinner=False)
+def coefficient_chart(fingerprint, _model):
+    """Bar chart of the model coefficients, excluding the intercept"""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 4))
+    _model.params[1:].plot(kind='barh', ax=ax)
+    ax.set_title("Standardized Coefficient Magnitudes")
+    ax.set_xlabel("Effect Size")
+    return figure_png(fig)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def partregress_chart(fingerprint, _model):
+    """Partial regression grid for every predictor"""
+    import matplotlib.pyplot as plt
+    import statsmodels.api as sm
+    fig = plt.figure(figsize=(15, 5))
+    sm.graphics.plot_partregress_grid(_model, fig=fig)
+    return figure_png(fig)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def residual_chart(fingerprint, _model, selected_var):
+    """Lowess residual plot against one predictor"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    fig, ax = plt.subplots(figsize=(10, 4))
+    sns.regplot(x=_model.model.data.orig_exog[selected_var], y=_model.resid, lowess=True, ax=ax)
+    ax.axhline(0, color='red', linestyle='--')
+    ax.set_title(f"Residuals vs {selected_var}")
+    return figure_png(fig)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def influence_charts(fingerprint, _model, _hat_matrix_diag, _cooks):
+    """Cook's distance stem plot and leverage scatter"""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.stem(_cooks, markerfmt=",")
+    ax.set_title("Cook's Distance for Influential Points")
+    ax.set_xlabel("Observation Index")
+    ax.set_ylabel("Cook's Distance")
+    cooks_png = figure_png(fig)
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.scatter(_hat_matrix_diag, _model.resid_pearson)
+    ax.set_xlabel("Leverage (Hat values)")
+    ax.set_ylabel("Standardized Residuals")
+    ax.set_title("Leverage vs Residuals")
+    return cooks_png, figure_png(fig)
+
+# One per server process, so only the first rerun after a refresh clears the caches
+@st.cache_resource
+def refresh_seen():
+    """Version of the refresh daemon's stamp the caches were last cleared for"""
+    return {"version": None}
+
+def sync_refresh():
+    """Drop every cached dataset, fit and figure once the refresh daemon reports new data"""
+    state = read_state()
+    seen = refresh_seen()
+    if state.get("version") != seen["version"]:
+        if seen["version"] is not None:
+            st.cache_data.clear()
+            for cached in (fit_season_model, fit_unweighted_model, get_search_index):
+                cached.clear()
+        seen["version"] = state.get("version")
+    return state
+
+def lazy_expander(label, key, expanded=False):
+    """Expander whose body only runs while it is open"""
+    return st.expander(label, expanded=expanded, key=key, on_change="rerun")
+
+# Every rerun is one run of the app's metrics: load, fit, predict and render spans, written
+# when the script finishes or is interrupted by a newer rerun (nothing is recorded unless
+# FPL_METRICS_DIR is set)
+with metrics.run("app"):
+    st.title('Goal Involvement OLS Model')
+    refresh_state = sync_refresh()
+    if refresh_state.get("refreshed_at"):
+        st.caption(f"Data refreshed {refresh_state['refreshed_at'].replace('T', ' ')} ({', '.join(refresh_state['datasets'])})")
+
+    # Season data version keys every cached step below
+    season_version = dataset_version(SEASON_PATH)
+    threshold_pct = st.session_state.threshold / 100
+
+    # Per-match history allows any form window; without it only the scraped 5 games table exists
+    if os.path.exists(MATCHES_PATH):
+        form_window = st.session_state.form_window
+        form_path, form_version = MATCHES_PATH, file_version(MATCHES_PATH)
+    else:
+        form_window = None
+        form_path, form_version = FORM_PATH, dataset_version(FORM_PATH)
+
+    # The start-up model has the caps for every threshold, so the rankings need no season data
+    artifact = get_artifact(get_source_key(SEASON_PATH, season_version), get_source_key(form_path, form_version))
+    if artifact is not None:
+        season_caps = caps_at(artifact.sweep, st.session_state.threshold)
+    else:
+        season_caps = get_season_caps(season_version, threshold_pct)
+
+    # Only the open tab runs, so a new session never touches the Model Summary's fits and figures
+    tab1, tab2, tab3 = st.tabs(["NpGI90 Predictor", "Model Summary", "Squad Builder"], key="view", on_change="rerun")
+
+    with tab2:
+        if tab2.open:
+            # Dynamic threshold control
+            st.slider(
+                'Season minutes threshold (%)', 
+                0, 100, st.session_state.threshold,
+                format='%d%%',
+                help="Percentage of maximum season minutes required for uncapped stats",
+                key="threshold_widget", on_change=keep, args=("threshold",)
+            )
+
+            # Look up the precomputed capping thresholds and weighted fit for this slider position
+            with metrics.timer("fit", step="sweep"):
+                sweep_results = get_sweep(season_version)
+            season_fit = sweep_results.loc[round(threshold_pct * 100)]
+
+            if not season_caps and threshold_pct > 0:
+                st.warning(f"Not enough qualified players ({season_fit['eligible']}) at {threshold_pct:.0%} threshold!")
+
+            if season_caps:
+                # New Enhanced Model Diagnostics Section
+                st.subheader("Model Diagnostics")
+
+                # Top Metrics Row
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("R-squared", f"{season_fit['rsquared']:.1%}", 
+                             help="Proportion of variance explained by model")
+                with col2:
+                    st.metric("Adj. R-squared", f"{season_fit['rsquared_adj']:.1%}",
+                             help="R-squared adjusted for number of predictors")
+                with col3:
+                    st.metric("F-statistic", f"{season_fit['fvalue']:.1f}",
+                             help="Overall significance of model")
+                with col4:
+                    st.metric("AIC/BIC", f"{season_fit['aic']:.1f}/{season_fit['bic']:.1f}",
+                             help="Information criteria for model comparison")
+
+                # Assumption Checking Expandable Section
+                assumption_checks = lazy_expander("Regression Assumption Checks", "assumption_checks", expanded=True)
+                with assumption_checks:
+                    if assumption_checks.open:
+                        assumption_col1, assumption_col2, assumption_col3 = st.columns(3)
+
+                        with metrics.timer("fit", step="assumption_checks"):
+                            p_norm, p_het, max_vif = get_assumption_checks(season_version, threshold_pct)
+
+                        # Normality Test
+                        assumption_col1.metric("Normality (p-value)", 
+                                              f"{p_norm:.4f}",
+                                              help="Jarque-Bera test of residual normality")
+
+                        # Heteroscedasticity Test
+                        assumption_col2.metric("Homoscedasticity (p-value)", 
+                                              f"{p_het:.4f}",
+                                              help="Breusch-Pagan test for constant variance")
+
+                        # Multicollinearity Check
+                        assumption_col3.metric("Max VIF", 
+                                              f"{max_vif:.1f}",
+                                              help="Variance Inflation Factor (VIF > 10 indicates multicollinearity)")
+                # Enhanced Variable Analysis Section
+                variable_analysis = lazy_expander("Detailed Variable Analysis", "variable_analysis", expanded=True)
+                with variable_analysis:
+                    if variable_analysis.open:
+                        with metrics.timer("fit", step="season_model"):
+                            model = fit_season_model(season_version, threshold_pct)
+                        fingerprint = model_fingerprint(model)
+
+                        with metrics.timer("render", step="variable_analysis"):
+                            # Coefficient Plot
+                            st.image(coefficient_chart(fingerprint, model))
+
+                            # Partial Regression Plots
+                            st.write("**Partial Regression Plots**")
+                            st.image(partregress_chart(fingerprint, model))
+
+                # Model Comparison Section
+                model_comparison = lazy_expander("Model Comparison", "model_comparison")
+                with model_comparison:
+                    if model_comparison.open:
+                        # Compare with unweighted model
+                        with metrics.timer("fit", step="unweighted_model"):
+                            simple_model = fit_unweighted_model(season_version, threshold_pct)
+                        comparison_df = pd.DataFrame({
+                            'Weighted': [season_fit['rsquared'], season_fit['aic'], season_fit['bic']],
+                            'Unweighted': [simple_model.rsquared, simple_model.aic, simple_model.bic]
+                        }, index=['R-squared', 'AIC', 'BIC'])
+                        st.dataframe(comparison_df.style.format("{:.2f}"), 
+                                    use_container_width=True)
+
+                # Coefficient and fit stability across every slider position, from the same sweep
+                threshold_stability = lazy_expander("Threshold Stability", "threshold_stability")
+                with threshold_stability:
+                    if threshold_stability.open:
+                        st.write("**Coefficients by threshold**")
+                        st.line_chart(sweep_results[COEFFICIENTS[1:]])
+                        st.write("**R-squared by threshold**")
+                        st.line_chart(sweep_results[['rsquared', 'rsquared_adj']])
+
+                # Interactive Coefficient Explorer
+                coefficient_exploration = lazy_expander("Interactive Coefficient Exploration", "coefficient_exploration")
+                with coefficient_exploration:
+                    if coefficient_exploration.open:
+                        model = fit_season_model(season_version, threshold_pct)
+                        selected_var = st.selectbox("Choose variable to explore:", 
+                                                   model.params.index[1:])  # Exclude intercept
+                        var_details = {
+                            'Coefficient': model.params[selected_var],
+                            'P-value': model.pvalues[selected_var],
+                            'CI Lower': model.conf_int().loc[selected_var, 0],
+                            'CI Upper': model.conf_int().loc[selected_var, 1]
+                        }
+                        st.json(var_details)
+
+                        # Individual residual plot
+                        with metrics.timer("render", step="residual_chart"):
+                            st.image(residual_chart(model_fingerprint(model), model, selected_var))
+
+                # Replace original plots with more informative versions
+                advanced_diagnostics = lazy_expander("Advanced Diagnostics", "advanced_diagnostics")
+                with advanced_diagnostics:
+                    if advanced_diagnostics.open:
+                        model = fit_season_model(season_version, threshold_pct)
+
+                        # Leverage and Cook's distance
+                        with metrics.timer("fit", step="influence"):
+                            hat_matrix_diag, cooks = get_influence(season_version, threshold_pct)
+
+                        # Cook's Distance and Leverage Plots
+                        with metrics.timer("render", step="influence_charts"):
+                            cooks_png, leverage_png = influence_charts(model_fingerprint(model), model, hat_matrix_diag, cooks)
+                            st.image(cooks_png)
+                            st.image(leverage_png)
+    with tab1:
+        if tab1.open:
+            if not season_caps:
+                st.warning("No season caps at this threshold - using uncapped data. Adjust the threshold in the Model Summary tab.")
+
+            if form_window is not None:
+                st.radio("Form window", FORM_WINDOWS, index=FORM_WINDOWS.index(form_window),
+                         format_func=lambda n: f"Last {n} games", horizontal=True,
+                         key="form_window_widget", on_change=keep, args=("form_window",))
+
+            # Load pre-filtered form data (already ≥180 mins), capped with the season caps; the default
+            # view comes ready-made from the start-up model
+            with metrics.timer("predict", step="rankings"):
+                if artifact is not None and (artifact.threshold, artifact.window) == (st.session_state.threshold, form_window):
+                    df_ranked = artifact.rankings
+                else:
+                    df_ranked = rank_form_players(form_version, season_caps, form_window)
+                    df_ranked = df_ranked.join(rank_intervals(form_version, season_caps, form_window))
+
+            # Search implementation
+            st.header('Player Ranking Based on Predicted Goal Involvements')
+            search_term = st.text_input("Search Player:")
+
+            # Filter based on search, best matches first (accents and small typos are tolerated)
+            filtered_df = df_ranked
+            if search_term:
+                with metrics.timer("predict", step="search"):
+                    search_index = get_search_index(form_version, season_caps, form_window)
+                    filtered_df = filtered_df.iloc[search_index.search(search_term)]
+
+            # Display results
+            with metrics.timer("render", step="rankings"):
+                st.dataframe(filtered_df[RANKING_COLUMNS], height=600)
+
+            st.markdown(f"""
+            **Guide**: Rankings based on last {form_window or 5} games (min 180 mins played). 
+            Stats capped using season-long 95th percentile values from players meeting the threshold.
+            Low/High columns are 90% bootstrap intervals (2,000 resamples of the form model); players whose rank ranges overlap are not clearly separated.
+            """)
+
+    with tab3:
+        if tab3.open:
+            if not os.path.exists(PRICES_PATH):
+                st.info(f"Squad building needs FPL prices and positions: run `python squad.py fetch-prices` to save them to {PRICES_PATH}.")
             else:
-                # For OLS models
-                hat_matrix_diag = influence.hat_matrix_diag
-                cooks = influence.cooks_distance[0]
-
-            # Cook's Distance Plot
-            plt.figure(figsize=(10, 4))
-            plt.stem(cooks, markerfmt=",")
-            plt.title("Cook's Distance for Influential Points")
-            plt.xlabel("Observation Index")
-            plt.ylabel("Cook's Distance")
-            st.pyplot(plt)
-            
-            # Leverage Plot
-            fig, ax = plt.subplots(figsize=(10, 4))
-            ax.scatter(hat_matrix_diag, model.resid_pearson)
-            ax.set_xlabel("Leverage (Hat values)")
-            ax.set_ylabel("Standardized Residuals")
-            ax.set_title("Leverage vs Residuals")
-            st.pyplot(fig)
-with tab1:
-    # Load pre-filtered form data (already ≥180 mins)
-    form_df = pd.read_csv("data/form_stats.csv").drop_duplicates(subset=['Player'], keep='first')
-    
-    # Apply season-based capping from session state
-    capped_form = apply_capping(form_df, st.session_state.get('season_caps', {}))
-    
-    if not st.session_state.season_caps:
-        st.warning("Season caps not calculated yet - using uncapped data. Adjust threshold in Model Summary tab first.")
-    
-    # Form model processing
-    capped_form['npxG90'] = capped_form['NPxG90_xA90'] - capped_form['xA90']
-    capped_form['xGChain_xGBuildup'] = capped_form['xGChain90'] - capped_form['xGBuildup90']
-    capped_form['SP_Chain_Buildup'] = (capped_form['NPxG90_xA90'] - capped_form['xGChain_xGBuildup']) / capped_form['NPxG90_xA90']
-    capped_form.replace([np.inf, -np.inf], np.nan, inplace=True)
-    capped_form.dropna(inplace=True)
-
-    # Prediction model
-    X_form = sm.add_constant(capped_form[['xGChain_xGBuildup', 'SP_Chain_Buildup', 'xA90']])
-    y_form = capped_form['NPxG90_xA90']
-    form_model = sm.OLS(y_form, X_form).fit()
-    
-    # Generate predictions and rankings
-    capped_form['NPGI Per 90'] = form_model.predict(X_form)
-    capped_form['Rank'] = capped_form['NPGI Per 90'].rank(ascending=False)
-    df_ranked = capped_form.sort_values(by='Rank')
-
-    # Search implementation
-    st.header('Player Ranking Based on Predicted Goal Involvements')
-    search_term = st.text_input("Search Player:")
-    
-    # Filter based on search
-    filtered_df = df_ranked.copy()
-    if search_term:
-        filtered_df = filtered_df[filtered_df['Player'].str.contains(search_term, case=False)]
-    
-    # Display results
-    columns_to_display = ['Rank', 'Player', 'Team', 'NPGI Per 90', 'npxG90', 'xA90', 'xGChain90', 'xGBuildup90']
-    st.dataframe(filtered_df[columns_to_display], height=600)
-    
-    st.markdown("""
-    **Guide**: Rankings based on last 5 games (min 180 mins played). 
-    Stats capped using season-long 95th percentile values from players meeting the threshold.
-    """)
-
-# Footer
-st.markdown("---")
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.write("© Fpl-Assistant All rights reserved.")
-
-linkedin = "https://raw.githubusercontent.com/sahirmaharaj/exifa/main/img/linkedin.gif"
-x1 = "https://unbounce.com/photos/metaX.svg"
-email = "https://raw.githubusercontent.com/sahirmaharaj/exifa/main/img/email.gif"
-
-with col3:
-    st.caption(
-    f"""
-        <div style='display: flex; align-items: center;'>
-            <a href = 'https://www.linkedin.com/in/kevin-ofori-900119235/'><img src='{linkedin}' style='width: 35px; height: 35px; margin-right: 25px;'></a>
-            <a href = 'https://x.com/oforii_k'><img src='{x1}' style='width: 32px; height: 32px; margin-right: 25px;'></a>
-            <a href = 'mailto:kevinagyei2017@gmail.com'><img src='{email}' style='width: 28px; height: 28px; margin-right: 25px;'></a>
-        </div>
-        """,
-    unsafe_allow_html=True,
-)
\ No newline at end of file
+                prices_version = file_version(PRICES_PATH)
+                with metrics.timer("load", dataset="fpl_prices"):
+                    pool = get_squad_pool(form_version, season_caps, form_window, prices_version)
+                # Selections are kept by player label rather than pool position, so they still name
+                # the same players after the prices or rankings change
+                labels = pool['Player'] + ' (' + pool['Team'] + ', ' + pool['Position'] + ')'
+                positions = dict(zip(labels, pool.index))
+
+                budget = st.number_input("Budget (£m)", min_value=0.0, max_value=200.0, value=st.session_state.budget, step=0.5,
+                                         key="budget_widget", on_change=keep, args=("budget",))
+                locked = st.multiselect("Lock players", list(positions),
+                                        default=[name for name in st.session_state.locked if name in positions],
+                                        key="locked_widget", on_change=keep, args=("locked",))
+                excluded = st.multiselect("Exclude players", [name for name in positions if name not in locked],
+                                          default=[name for name in st.session_state.excluded if name in positions and name not in locked],
+                                          key="excluded_widget", on_change=keep, args=("excluded",))
+                locked_positions = tuple(sorted(positions[name] for name in locked))
+                excluded_positions = tuple(sorted(positions[name] for name in excluded))
+                with metrics.timer("predict", step="squad"):
+                    squad, xi = best_squad(form_version, season_caps, form_window, prices_version, budget, locked_positions, excluded_positions)
+
+                if squad is None:
+                    st.warning("No squad fits the budget, position quotas and three-per-club limit with these locked and excluded players.")
+                else:
+                    squad = squad.assign(XI=squad.index.isin(xi.index))
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Cost", f"£{squad['Price'].sum():.1f}m")
+                    col2.metric("Squad NPGI Per 90", f"{squad['Score'].sum():.2f}")
+                    col3.metric("XI NPGI Per 90", f"{xi['Score'].sum():.2f}")
+                    st.dataframe(squad[['Player', 'Team', 'Position', 'Price', 'Score', 'XI', 'Locked']], hide_index=True)
+
+                st.markdown("""
+                **Guide**: 15 players (2 GK, 5 DEF, 5 MID, 3 FWD), at most 3 per club, maximising the total predicted NPGI Per 90
+                of the current form rankings. Players without a ranking score 0 and only fill places cheaply.
+                The XI is the best eleven with at least 1 GK, 3 DEF, 2 MID and 1 FWD.
+                """)
+
+    # Footer
+    st.markdown("---")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.write("© Fpl-Assistant All rights reserved.")
+
+    linkedin = "https://raw.githubusercontent.com/sahirmaharaj/exifa/main/img/linkedin.gif"
+    x1 = "https://unbounce.com/photos/metaX.svg"
+    email = "https://raw.githubusercontent.com/sahirmaharaj/exifa/main/img/email.gif"
+
+    with col3:
+        st.caption(
+        f"""
+            <div style='display: flex; align-items: center;'>
+                <a href = 'https://www.linkedin.com/in/kevin-ofori-900119235/'><img src='{linkedin}' style='width: 35px; height: 35px; margin-right: 25px;'></a>
+                <a href = 'https://x.com/oforii_k'><img src='{x1}' style='width: 32px; height: 32px; margin-right: 25px;'></a>
+                <a href = 'mailto:kevinagyei2017@gmail.com'><img src='{email}' style='width: 28px; height: 28px; margin-right: 25px;'></a>
+            </div>
+            """,
+        unsafe_allow_html=True,
+    )
@@ -0,0 +1,127 @@
+import argparse
+import logging
+from datetime import datetime
+import db
+import metrics
+from artifact import write_artifact
+from datasets import save_dataset
+from playwright.sync_api import Playwright, sync_playwright
+import player_stat1
+import playwrit
+from understat import LEAGUE_URL, capture_player_responses, wait_for_players
+
+def open_league_page(browser):
+    """Start loading the league page in a fresh context, returning before it has rendered"""
+    # Each view gets its own context so the table popup state never leaks between them
+    context = browser.new_context()
+    page = context.new_page()
+    responses = capture_player_responses(page)
+    page.goto(LEAGUE_URL, wait_until="commit", timeout=30000)
+    return page, responses
+
+def collect_datasets(browser, mode="data"):
+    """Scrape the season and form records with an already running browser. Only the page
+    loads overlap: the sync API blocks on every call, so the two datasets are then read one
+    after the other (async_scraper.py reads them concurrently)."""
+    pages = []
+    try:
+        # Start both navigations before waiting on either so the page loads overlap.
+        # In data mode the form dataset comes from the season page's context instead.
+        logging.info("Navigating to understat.com...")
+        page, responses = open_league_page(browser)
+        pages.append(page)
+        form_page = open_league_page(browser)[0] if mode == "dom" else None
+        if form_page:
+            pages.append(form_page)
+
+        with metrics.timer("navigate", dataset="season_stats"):
+            ready = wait_for_players(page)
+        if not ready:
+            return [], []
+        season_players = player_stat1.scrape(page, mode, responses)
+
+        form_players = []
+        if mode == "data":
+            with metrics.timer("read_dataset", dataset="form_stats"):
+                form_players = playwrit.read_dataset(page)
+        if not form_players:
+            if form_page is None:
+                logging.warning("Form dataset not available, loading a separate page for the table")
+                form_page = open_league_page(browser)[0]
+                pages.append(form_page)
+            with metrics.timer("navigate", dataset="form_stats"):
+                ready = wait_for_players(form_page)
+            if ready:
+                form_players = playwrit.scrape(form_page, "dom")
+        return season_players, form_players
+    except Exception:
+        try:
+            pages[-1].screenshot(path=f"error_screenshot_daily_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+        except:
+            pass
+        raise
+    finally:
+        for page in pages:
+            page.context.close()
+
+def daily_stats(mode="data"):
+    """Scrape the season and form datasets from a single browser launch"""
+    def run(playwright: Playwright) -> None:
+        browser = None
+        try:
+            with metrics.timer("launch"):
+                browser = playwright.chromium.launch(headless=True)
+            season_players, form_players = collect_datasets(browser, mode)
+
+            if save_dataset("season_stats", season_players):
+                logging.info("Season stats saved successfully")
+            else:
+                logging.error("Failed to save season stats")
+            if save_dataset("form_stats", form_players):
+                logging.info("Form stats saved successfully")
+            else:
+                logging.error("Failed to save form stats")
+
+            # Both datasets go to Postgres in one transaction, so readers never see half a run
+            if db.DATABASE_URL:
+                with metrics.timer("db_load"):
+                    db.load_run({"season_stats": season_players, "form_stats": form_players})
+
+            # The app's start-up model is built from the data as the app will now read it
+            try:
+                with metrics.timer("artifact"):
+                    write_artifact()
+            except Exception as e:
+                logging.warning(f"Could not write the model artifact: {e}")
+
+        except Exception as e:
+            logging.error(f"Fatal error in daily_stats: {e}", exc_info=True)
+            metrics.count("errors")
+        finally:
+            if browser:
+                browser.close()
+
+    with metrics.run("daily_stats"), sync_playwright() as playwright:
+        run(playwright)
+
+if __name__ == "__main__":
+    # Setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f'daily_stats_{datetime.now().strftime("%Y%m%d")}.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Scrape understat season and form stats in one browser session")
+    parser.add_argument("--mode", choices=["data", "dom"], default="data",
+                        help="data reads the player datasets shipped with the page, dom paginates the tables")
+    args = parser.parse_args()
+
+    logging.info("=" * 50)
+    logging.info("Starting daily stats scraper")
+    logging.info("=" * 50)
+    daily_stats(args.mode)
+    logging.info("Daily stats scraper completed")
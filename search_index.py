@@ -0,0 +1,77 @@
+import re
+import unicodedata
+from collections import defaultdict
+import numpy as np
+
+# Letters that NFKD does not decompose into a base letter plus accents
+TRANSLITERATIONS = str.maketrans({
+    'ø': 'o', 'Ø': 'O', 'æ': 'ae', 'Æ': 'AE', 'œ': 'oe', 'Œ': 'OE', 'ß': 'ss',
+    'đ': 'd', 'Đ': 'D', 'ð': 'd', 'Ð': 'D', 'þ': 'th', 'Þ': 'TH', 'ł': 'l', 'Ł': 'L', 'ı': 'i'
+})
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# Bonuses on top of the trigram recall score
+PLAYER_SUBSTRING_BONUS = 1.0
+TEAM_SUBSTRING_BONUS = 0.5
+TEAM_WEIGHT = 0.8
+
+def fold(text):
+    """Lowercase ASCII form of a name: accents stripped, special letters transliterated"""
+    decomposed = unicodedata.normalize('NFKD', str(text).translate(TRANSLITERATIONS))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return NON_ALNUM.sub(' ', stripped.lower()).strip()
+
+def trigrams(key, pad_end=True):
+    """Trigrams of each word, padded so that short prefixes still produce trigrams"""
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} " if pad_end else f"  {word}"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class SearchIndex:
+    """Trigram index over player and team names, built once per dataset version"""
+
+    def __init__(self, players, teams):
+        self.players = [fold(p) for p in players]
+        self.teams = [fold(t) for t in teams]
+        self.size = len(self.players)
+        self.player_postings = self._postings(self.players)
+        self.team_postings = self._postings(self.teams)
+
+    @staticmethod
+    def _postings(keys):
+        postings = defaultdict(list)
+        for i, key in enumerate(keys):
+            for gram in trigrams(key):
+                postings[gram].append(i)
+        return {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def _recall(self, postings, grams):
+        """Share of the query's trigrams found in each entry"""
+        hits = [postings[g] for g in grams if g in postings]
+        if not hits:
+            return np.zeros(self.size)
+        return np.bincount(np.concatenate(hits), minlength=self.size) / len(grams)
+
+    def search(self, query, limit=None, min_score=0.6):
+        """Positions of matching entries, best match first and ties in index order"""
+        key = fold(query)
+        if not key:
+            return np.arange(self.size)
+
+        # The last word may still be being typed, so it is matched as a prefix
+        words = key.split()
+        grams = trigrams(' '.join(words[:-1])) | trigrams(words[-1], pad_end=False)
+        scores = np.maximum(self._recall(self.player_postings, grams),
+                            TEAM_WEIGHT * self._recall(self.team_postings, grams))
+
+        candidates = np.flatnonzero(scores >= min_score)
+        for i in candidates:
+            if key in self.players[i]:
+                scores[i] += PLAYER_SUBSTRING_BONUS
+            elif key in self.teams[i]:
+                scores[i] += TEAM_SUBSTRING_BONUS
+
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return order[:limit] if limit else order
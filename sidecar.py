@@ -0,0 +1,71 @@
+import argparse
+import hashlib
+import logging
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Typed binary copies of the scraped CSVs for the app's read path: Team as a categorical,
+# metrics as float32, written uncompressed so a read is one copy into pandas with nothing to
+# parse or decompress. Each sidecar records the hash of the CSV it was built from; a sidecar
+# that no longer matches its CSV is ignored and the CSV is parsed instead.
+SIDECAR_SUFFIX = ".feather"
+CATEGORICAL = ["Team"]
+INTEGER = ["Minutes"]
+SOURCE_KEY = b"source_sha1"
+
+def sidecar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + SIDECAR_SUFFIX
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest().encode()
+
+def compact(df):
+    """Narrowest dtypes the app can work with"""
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORICAL:
+            df[col] = df[col].astype("category")
+        elif col in INTEGER:
+            df[col] = df[col].astype("int32")
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype("float32")
+    return df
+
+def write_sidecar(csv_path, df=None):
+    """Write the sidecar for a CSV, from the frame just saved to it or from the file itself"""
+    df = pd.read_csv(csv_path) if df is None else df
+    table = pa.Table.from_pandas(compact(df), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_KEY: file_digest(csv_path)})
+    path = sidecar_path(csv_path)
+    feather.write_feather(table, f"{path}.partial", compression="uncompressed")
+    os.replace(f"{path}.partial", path)
+    logging.info(f"Saved sidecar {path}")
+    return path
+
+def read_sidecar(csv_path):
+    """The sidecar's frame, or None when it is missing or was built from a different CSV"""
+    path = sidecar_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    table = feather.read_table(path)
+    if (table.schema.metadata or {}).get(SOURCE_KEY) != file_digest(csv_path):
+        logging.info(f"Sidecar {path} is stale, reading {csv_path}")
+        return None
+    return table.to_pandas()
+
+def read_dataset(csv_path):
+    """A scraped dataset, from its sidecar when it is current and the CSV otherwise"""
+    df = read_sidecar(csv_path)
+    return df if df is not None else pd.read_csv(csv_path)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Build binary sidecars for scraped CSVs")
+    parser.add_argument("csv", nargs="*", default=["data/season_stats.csv", "data/form_stats.csv"])
+    args = parser.parse_args()
+    for csv_path in args.csv:
+        write_sidecar(csv_path)
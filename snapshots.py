@@ -0,0 +1,118 @@
+import argparse
+import hashlib
+import logging
+import os
+from datetime import date
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Append-only history of the scraped datasets, one Parquet file per change:
+#   data/snapshots/dataset=<name>/date=<YYYY-MM-DD>/<content hash>.parquet
+# A snapshot is only written when its content differs from the latest one before it,
+# so a snapshot stays current until the next partition date of its dataset.
+SNAPSHOT_ROOT = "data/snapshots"
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+def content_hash(df):
+    """Order-insensitive hash of a dataset's rows and columns"""
+    canonical = df.sort_values(list(df.columns), kind="mergesort").reset_index(drop=True)
+    digest = hashlib.sha256(",".join(canonical.columns).encode())
+    digest.update(pd.util.hash_pandas_object(canonical, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+def snapshot_dates(dataset, root=SNAPSHOT_ROOT):
+    """Sorted partition dates that hold a snapshot of the dataset"""
+    directory = os.path.join(root, f"dataset={dataset}")
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name.split("=", 1)[1] for name in os.listdir(directory) if name.startswith("date="))
+
+def snapshot_file(dataset, snapshot_date, root=SNAPSHOT_ROOT):
+    """Path of the Parquet file in one date partition, or None when it is empty"""
+    directory = os.path.join(root, f"dataset={dataset}", f"date={snapshot_date}")
+    files = sorted(name for name in os.listdir(directory) if name.endswith(".parquet"))
+    return os.path.join(directory, files[-1]) if files else None
+
+def latest_date(dataset, as_of=None, root=SNAPSHOT_ROOT):
+    """Date of the snapshot in effect on `as_of` (default: the newest)"""
+    dates = snapshot_dates(dataset, root)
+    if as_of is not None:
+        dates = [d for d in dates if d <= str(as_of)]
+    return dates[-1] if dates else None
+
+def append_snapshot(dataset, df, snapshot_date=None, root=SNAPSHOT_ROOT):
+    """Store a dataset snapshot unless it matches the one already in effect; returns the file written"""
+    snapshot_date = str(snapshot_date or date.today())
+    digest = content_hash(df)
+
+    previous = latest_date(dataset, snapshot_date, root)
+    if previous is not None:
+        path = snapshot_file(dataset, previous, root)
+        if path and os.path.basename(path) == f"{digest}.parquet":
+            logging.info(f"{dataset} unchanged since {previous}, no snapshot written")
+            return None
+
+    directory = os.path.join(root, f"dataset={dataset}", f"date={snapshot_date}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{digest}.parquet")
+    # Written beside the dataset tree, not in it, so a history read never opens a half-written file
+    partial = os.path.join(root, f".{dataset}-{snapshot_date}-{digest}.parquet.partial")
+    # Sorted by player so row-group statistics let history reads skip most of each file
+    table = pa.Table.from_pandas(df.sort_values("Player", kind="mergesort"), preserve_index=False)
+    pq.write_table(table, partial, row_group_size=1024)
+    # A rewrite on the same day replaces that day's snapshot
+    for name in os.listdir(directory):
+        if name.endswith(".parquet"):
+            os.remove(os.path.join(directory, name))
+    os.replace(partial, path)
+    logging.info(f"Stored {len(df)} {dataset} rows in {path}")
+    return path
+
+def as_of(dataset, snapshot_date=None, root=SNAPSHOT_ROOT):
+    """The dataset as it was on a date; reads a single partition"""
+    found = latest_date(dataset, snapshot_date, root)
+    if found is None:
+        return None
+    return pq.read_table(snapshot_file(dataset, found, root)).to_pandas()
+
+def player_history(player, dataset="season_stats", start=None, end=None, root=SNAPSHOT_ROOT):
+    """One row per stored snapshot for a player, with the date each one took effect"""
+    directory = os.path.join(root, f"dataset={dataset}")
+    if not os.path.isdir(directory):
+        return pd.DataFrame()
+
+    # Partition pruning on date, row-group pruning on Player
+    history = ds.dataset(directory, format="parquet", partitioning=PARTITIONING)
+    condition = ds.field("Player") == player
+    if start is not None:
+        # The snapshot in effect on the start date began on or before it
+        condition &= ds.field("date") >= (latest_date(dataset, start, root) or str(start))
+    if end is not None:
+        condition &= ds.field("date") <= str(end)
+    df = history.to_table(filter=condition).to_pandas()
+    return df.sort_values("date").reset_index(drop=True)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Read or store dataset snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    store = commands.add_parser("store", help="snapshot a scraped CSV")
+    store.add_argument("dataset", choices=["season_stats", "form_stats"])
+    store.add_argument("--date", default=None, help="snapshot date (default: today)")
+    show = commands.add_parser("as-of", help="print a dataset as of a date")
+    show.add_argument("dataset", choices=["season_stats", "form_stats"])
+    show.add_argument("date", nargs="?", default=None)
+    history = commands.add_parser("history", help="print a player's snapshots over time")
+    history.add_argument("player")
+    history.add_argument("--dataset", choices=["season_stats", "form_stats"], default="season_stats")
+    args = parser.parse_args()
+
+    if args.command == "store":
+        append_snapshot(args.dataset, pd.read_csv(f"data/{args.dataset}.csv"), args.date)
+    elif args.command == "as-of":
+        print(as_of(args.dataset, args.date))
+    else:
+        print(player_history(args.player, args.dataset).to_string(index=False))
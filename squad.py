@@ -0,0 +1,299 @@
+import argparse
+import json
+import logging
+import os
+import urllib.request
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from search_index import fold
+
+# FPL squad selection from the form rankings: 15 players within a budget, fixed position
+# quotas and at most three per club, maximising the squad's total predicted NPGI Per 90.
+# Dominated players are dropped first, then an exact branch and bound runs over the rest,
+# bounded by per-position budget DP tables with the club limit moved into per-club
+# score penalties (a Lagrangian relaxation).
+PRICES_PATH = "data/fpl_prices.csv"
+PRICE_COLUMNS = ["Player", "Web Name", "Team", "Position", "Price"]
+BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+ELEMENT_TYPES = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+QUOTAS = {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3}
+# Minimum starters per position; the maxima can never bind with the squad quotas above
+XI_MINIMUMS = {"GK": 1, "DEF": 3, "MID": 2, "FWD": 1}
+XI_SIZE = 11
+MAX_PER_CLUB = 3
+BUDGET = 100.0
+SCORE = "NPGI Per 90"
+LAGRANGE_ROUNDS = 30
+LAGRANGE_DECAY = 0.8
+
+def fetch_prices(path=PRICES_PATH, url=BOOTSTRAP_URL):
+    """Download current FPL prices and positions to a local CSV for offline use"""
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        bootstrap = json.load(response)
+    teams = {team["id"]: team["name"] for team in bootstrap["teams"]}
+    prices = pd.DataFrame([{
+        "Player": f"{element['first_name']} {element['second_name']}",
+        "Web Name": element["web_name"],
+        "Team": teams[element["team"]],
+        "Position": ELEMENT_TYPES[element["element_type"]],
+        "Price": element["now_cost"] / 10
+    } for element in bootstrap["elements"] if element["element_type"] in ELEMENT_TYPES], columns=PRICE_COLUMNS)
+    prices.to_csv(path, index=False)
+    logging.info(f"Saved {len(prices)} prices to {path}")
+    return prices
+
+def load_prices(path=PRICES_PATH):
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path)
+
+def attach_scores(prices, df_ranked):
+    """Priced player pool with each player's predicted score; unranked players score 0.
+    Names are matched on full name, then FPL web name, then a surname only FPL player has."""
+    scores = {}
+    for player, score in zip(df_ranked["Player"], df_ranked[SCORE]):
+        scores.setdefault(fold(player), score)
+    surnames = {}
+    for key in scores:
+        surnames.setdefault(key.split()[-1], []).append(key)
+
+    pool = prices.copy()
+    full_names = pool["Player"].map(fold)
+    web_names = pool["Web Name"].map(fold)
+    web_name_counts = web_names.value_counts()
+    matched = []
+    for full_name, web_name in zip(full_names, web_names):
+        if full_name in scores:
+            matched.append(full_name)
+        elif web_name in scores:
+            matched.append(web_name)
+        elif web_name_counts[web_name] == 1 and len(surnames.get(web_name, [])) == 1:
+            matched.append(surnames[web_name][0])
+        else:
+            matched.append(None)
+    pool["Score"] = [scores.get(key, 0.0) for key in matched]
+    pool["Ranked"] = [key is not None for key in matched]
+    logging.info(f"Matched {pool['Ranked'].sum()} of {len(df_ranked)} ranked players to FPL prices")
+    return pool.reset_index(drop=True)
+
+def find_players(pool, names):
+    """Pool index labels of the named players, matched accent- and case-insensitively"""
+    keys = pool["Player"].map(fold)
+    found = []
+    for name in names:
+        matches = keys.index[keys == fold(name)]
+        if len(matches) == 0:
+            logging.warning(f"{name} is not in the price list")
+        found.extend(matches[:1])
+    return found
+
+def prune_dominated(pool, max_per_club=MAX_PER_CLUB):
+    """Drop players who can be swapped for a no worse, no dearer player of the same position
+    in any squad. That needs more such players than can be blocked: the position's other
+    squad places, plus everyone at clubs that the rest of the squad could have filled."""
+    full_clubs = (sum(QUOTAS.values()) - 1) // max_per_club
+    survivors = []
+    for position, quota in QUOTAS.items():
+        # Best first, so only earlier players can dominate; ties are broken by this order
+        group = pool[pool["Position"] == position].sort_values(["Score", "Price"], ascending=[False, True], kind="mergesort")
+        prices = group["Price"].to_numpy(float)
+        clubs, club_index = np.unique(group["Team"].to_numpy(object).astype(str), return_inverse=True)
+        for rank in range(len(group)):
+            dominators = club_index[:rank][prices[:rank] <= prices[rank]]
+            per_club = np.bincount(dominators, minlength=len(clubs))
+            per_club[club_index[rank]] = 0
+            if len(dominators) <= quota - 1 + np.sort(per_club)[::-1][:full_clubs].sum():
+                survivors.append(group.index[rank])
+    return pool.loc[sorted(survivors)]
+
+def fill_tables(scores, costs, quota, budget):
+    """table[i][r][b]: best total score of r players from position index i on costing at most b"""
+    n = len(scores)
+    table = np.full((n + 1, quota + 1, budget + 1), -np.inf)
+    table[:, 0, :] = 0
+    for i in range(n - 1, -1, -1):
+        table[i] = table[i + 1]
+        if costs[i] <= budget:
+            taken = table[i + 1, :-1, :budget + 1 - costs[i]] + scores[i]
+            table[i, 1:, costs[i]:] = np.maximum(table[i, 1:, costs[i]:], taken)
+    return table
+
+def max_plus(a, b):
+    """c[x] = max over y <= x of a[y] + b[x - y], for non-decreasing a and b"""
+    size = len(a)
+    # Only the costs where a steps up can be the best split; none at all when a is all -inf
+    steps = np.flatnonzero(a > np.concatenate([[-np.inf], a[:-1]]))
+    if len(steps) == 0:
+        return np.full(size, -np.inf)
+    # Row x of the reversed windows holds b[x - y] at column y (-inf where y > x)
+    shifted = sliding_window_view(np.concatenate([np.full(size - 1, -np.inf), b]), size)[:, ::-1]
+    return (a[steps] + shifted[:, steps]).max(axis=1)
+
+def pick_squad(pool, budget=BUDGET, locked=(), excluded=(), max_per_club=MAX_PER_CLUB):
+    """Highest scoring valid squad as a frame, or None when the constraints cannot be met.
+    `locked` and `excluded` are pool index labels."""
+    locked, excluded = set(locked), set(excluded)
+    costs_all = np.round(pool["Price"].to_numpy(float) * 10).astype(int)
+    price_of = dict(zip(pool.index, costs_all))
+
+    # Locked players are placed up front; the search fills whatever they leave
+    remaining = round(budget * 10) - sum(price_of[i] for i in locked)
+    needed = dict(QUOTAS)
+    clubs = {}
+    for i in locked:
+        needed[pool.at[i, "Position"]] -= 1
+        clubs[pool.at[i, "Team"]] = clubs.get(pool.at[i, "Team"], 0) + 1
+    if (remaining < 0 or max_per_club < 1 or min(needed.values()) < 0
+            or any(count > max_per_club for count in clubs.values())):
+        return None
+
+    open_pool = prune_dominated(pool.drop(index=list(locked | excluded)), max_per_club)
+    positions = [p for p in QUOTAS if needed[p] > 0]
+    groups = []
+    for position in positions:
+        group = open_pool[open_pool["Position"] == position].sort_values("Score", ascending=False, kind="mergesort")
+        costs = np.array([price_of[i] for i in group.index], dtype=int)
+        groups.append((list(group.index), group["Score"].to_numpy(float), costs, list(group["Team"])))
+    club_names = sorted({team for group in groups for team in group[3]} | set(clubs))
+    club_ids = [np.array([club_names.index(team) for team in group[3]], dtype=int) for group in groups]
+    free = np.array([max_per_club - clubs.get(name, 0) for name in club_names])
+
+    def relax(penalty):
+        """DP tables over scores less each player's club penalty, and the best fill of every
+        position after j for each budget (rest[j]), with the club limit dropped"""
+        tables = [fill_tables(group[1] - penalty[ids], group[2], needed[position], remaining)
+                  for group, ids, position in zip(groups, club_ids, positions)]
+        rest = [None] * len(positions) + [np.zeros(remaining + 1)]
+        for j in range(len(positions) - 1, -1, -1):
+            rest[j] = max_plus(tables[j][0, needed[positions[j]]], rest[j + 1])
+        return tables, rest
+
+    def relaxed_counts(tables, rest):
+        """Players per club in a squad attaining the relaxed optimum"""
+        counts = np.zeros(len(club_names), dtype=int)
+        money = remaining
+        for j, position in enumerate(positions):
+            table, need = tables[j], needed[position]
+            cap = int(np.argmax(table[0, need, :money + 1] + rest[j + 1][money::-1]))
+            money -= cap
+            for i in range(len(groups[j][0])):
+                if need == 0:
+                    break
+                if table[i, need, cap] != table[i + 1, need, cap]:
+                    counts[club_ids[j][i]] += 1
+                    cap -= groups[j][2][i]
+                    need -= 1
+            money += cap
+        return counts
+
+    # Subgradient steps on the club-limit multipliers: any penalties give a valid bound,
+    # well chosen ones a much tighter one when a few clubs are over-represented
+    penalty = np.zeros(len(club_names))
+    step = max([np.abs(group[1]).max() for group in groups if len(group[1])], default=0) / 2
+    best_bound = np.inf
+    for _ in range(LAGRANGE_ROUNDS):
+        tables, rest = relax(penalty)
+        if not np.isfinite(rest[0][remaining]):
+            return None
+        value = rest[0][remaining] + penalty @ free
+        if value < best_bound:
+            best_bound, best_relaxation, best_penalty = value, (tables, rest), penalty
+        excess = relaxed_counts(tables, rest) - free
+        if (excess <= 0).all() and penalty @ excess == 0:
+            break
+        penalty = np.maximum(0, penalty + step * excess)
+        step *= LAGRANGE_DECAY
+    tables, rest = best_relaxation
+    penalty = best_penalty
+
+    best = {"score": -np.inf, "picks": None}
+    picks = []
+
+    bounds = {}
+
+    def bound(j, i, need, money):
+        key = (j, i, need, money)
+        if key not in bounds:
+            bounds[key] = np.max(tables[j][i, need, :money + 1] + rest[j + 1][money::-1])
+        return bounds[key]
+
+    def search(j, start, need, money, score, slack):
+        # slack: the penalties of the club places still open, owed back by the relaxed bound
+        if need == 0:
+            if j + 1 < len(positions):
+                search(j + 1, 0, needed[positions[j + 1]], money, score, slack)
+            elif score > best["score"]:
+                best["score"], best["picks"] = score, list(picks)
+            return
+        index, scores, costs, teams = groups[j]
+        # Each iteration picks the next player taken at this position; skipped ones stay out
+        for i in range(start, len(index) - need + 1):
+            # The bound only shrinks as i grows, so nothing later can beat the incumbent either
+            if score + slack + bound(j, i, need, money) <= best["score"] + 1e-12:
+                return
+            team = teams[i]
+            if costs[i] > money or clubs.get(team, 0) >= max_per_club:
+                continue
+            clubs[team] = clubs.get(team, 0) + 1
+            picks.append(index[i])
+            search(j, i + 1, need - 1, money - costs[i], score + scores[i], slack - penalty[club_ids[j][i]])
+            picks.pop()
+            clubs[team] -= 1
+
+    if positions:
+        search(0, 0, needed[positions[0]], remaining, 0.0, penalty @ free)
+    else:
+        best["picks"] = []
+    if best["picks"] is None:
+        return None
+    squad = pool.loc[sorted(locked) + best["picks"]].copy()
+    squad["Locked"] = squad.index.isin(locked)
+    return sort_squad(squad)
+
+def sort_squad(squad):
+    order = {position: n for n, position in enumerate(QUOTAS)}
+    return squad.sort_values(["Position", "Score"], key=lambda col: col.map(order) if col.name == "Position" else -col, kind="mergesort")
+
+def starting_xi(squad):
+    """Best eleven of a squad: each position's minimum by score, then the best remaining outfielders"""
+    chosen = []
+    for position, minimum in XI_MINIMUMS.items():
+        chosen += list(squad[squad["Position"] == position].nlargest(minimum, "Score").index)
+    outfield = squad[(squad["Position"] != "GK") & ~squad.index.isin(chosen)]
+    chosen += list(outfield.nlargest(XI_SIZE - len(chosen), "Score").index)
+    return sort_squad(squad.loc[chosen])
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Pick the best FPL squad from the form rankings")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("fetch-prices", help=f"download FPL prices and positions to {PRICES_PATH}")
+    pick = commands.add_parser("pick", help="pick a squad and starting XI")
+    pick.add_argument("--budget", type=float, default=BUDGET)
+    pick.add_argument("--threshold", type=int, default=60, help="season minutes threshold (%%) used for capping")
+    pick.add_argument("--lock", action="append", default=[], metavar="PLAYER")
+    pick.add_argument("--exclude", action="append", default=[], metavar="PLAYER")
+    args = parser.parse_args()
+
+    if args.command == "fetch-prices":
+        fetch_prices()
+    else:
+        from model import rank_form
+        from sidecar import read_dataset
+        from threshold_sweep import caps_at, sweep
+        season_df = read_dataset("data/season_stats.csv").drop_duplicates(subset=['Player'], keep='first')
+        form_df = read_dataset("data/form_stats.csv").drop_duplicates(subset=['Player'], keep='first')
+        prices = load_prices()
+        if prices is None:
+            parser.error(f"{PRICES_PATH} not found; run fetch-prices first")
+        pool = attach_scores(prices, rank_form(form_df, caps_at(sweep(season_df), args.threshold)))
+        squad = pick_squad(pool, args.budget, find_players(pool, args.lock), find_players(pool, args.exclude))
+        if squad is None:
+            parser.error("No squad satisfies the budget, quotas and locks")
+        xi = starting_xi(squad)
+        squad["XI"] = squad.index.isin(xi.index)
+        print(squad[["Player", "Team", "Position", "Price", "Score", "XI"]].to_string(index=False))
+        print(f"\nCost {squad['Price'].sum():.1f}m, squad score {squad['Score'].sum():.3f}, XI score {xi['Score'].sum():.3f}")
@@ -0,0 +1,25 @@
+import os
+import pytest
+from fixture_server import FIXTURES_DIR, serve
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+def chromium_installed():
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as playwright:
+            return os.path.exists(playwright.chromium.executable_path)
+    except Exception:
+        return False
+
+# Browser tests replay the saved pages and need `playwright install chromium`
+needs_chromium = pytest.mark.skipif(not chromium_installed(), reason="Chromium is not installed for Playwright")
+
+@pytest.fixture
+def fixture_site():
+    """Base URL of a fixture server replaying the saved understat pages"""
+    server, base_url = serve()
+    yield base_url
+    server.shutdown()
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import shutil
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from api import RankingsService, create_app
+from artifact import FORM_PATH, SEASON_PATH
+from conftest import read_fixture
+from matches import MATCHES_PATH, load_matches, merge_matches, save_matches
+from understat import match_record, parse_matches_data, parse_players, parse_players_data
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEASON = 2025
+
+@pytest.fixture
+def datasets(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / "data")
+    for path in (SEASON_PATH, FORM_PATH):
+        shutil.copy(os.path.join(REPO, path), tmp_path / path)
+    monkeypatch.chdir(tmp_path)
+
+def fetch(service, path, headers=None):
+    async def get():
+        async with TestClient(TestServer(create_app(service))) as client:
+            response = await client.get(path, headers=headers)
+            return response.status, response.headers.get("ETag"), await response.read()
+    return asyncio.run(get())
+
+def test_matching_etag_skips_the_page(datasets):
+    service = RankingsService()
+    status, etag, body = fetch(service, "/rankings?per_page=5")
+    assert status == 200 and body.startswith(b'{"version"')
+
+    service.snapshot.page = lambda *args: pytest.fail("page built for a 304")
+    status, _, body = fetch(service, "/rankings?per_page=5", {"If-None-Match": etag})
+    assert status == 304 and body == b""
+
+def test_form_comes_from_the_match_store(datasets, monkeypatch):
+    monkeypatch.setattr("matches.current_season", lambda today=None: SEASON)
+    service = RankingsService()
+    asyncio.run(service.refresh())
+    from_csv = service.snapshot.version
+
+    league = parse_players_data(read_fixture("league_EPL.html"))
+    records = parse_players(parse_matches_data(read_fixture("player_1001.html")), match_record, 1001)
+    merged, _ = merge_matches(load_matches(MATCHES_PATH), records, league, "EPL", SEASON)
+    save_matches(merged, MATCHES_PATH)
+    asyncio.run(service.refresh())
+    assert service.snapshot.version != from_csv
+    assert [record["player"] for record in service.snapshot.records] == ["Erling Haaland"]
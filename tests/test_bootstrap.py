@@ -0,0 +1,15 @@
+import numpy as np
+import pandas as pd
+from bootstrap import bootstrap_intervals
+
+def test_workers_do_not_change_the_intervals():
+    rng = np.random.default_rng(3)
+    X = np.column_stack([np.ones(60), rng.normal(size=(60, 3))])
+    y = X @ [0.3, 0.1, -0.05, 0.2] + rng.normal(0, 0.1, 60)
+    index = pd.Index(range(100, 160))
+
+    serial = bootstrap_intervals(X, y, n_boot=500, chunk_size=100, index=index)
+    parallel = bootstrap_intervals(X, y, n_boot=500, chunk_size=100, index=index, workers=2)
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert (serial["NPGI Low"] <= serial["NPGI High"]).all()
+    assert (serial["Rank Low"] <= serial["Rank High"]).all()
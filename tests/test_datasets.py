@@ -0,0 +1,48 @@
+import os
+import pandas as pd
+from datasets import COLUMNS, CSV_PATHS, save_dataset
+from sidecar import read_sidecar
+from snapshots import as_of
+from understat import current_season, is_app_season, partition_path
+
+SEASON_ROW = dict(zip(COLUMNS["season_stats"], ["A Player", "A Team", 900, 0.5, 0.1, 0.6, 0.7, 0.2]))
+FORM_ROW = dict(zip(COLUMNS["form_stats"], ["A Player", "A Team", 0.1, 0.6, 0.7, 0.2]))
+
+def test_app_season():
+    assert is_app_season("EPL", None)
+    assert is_app_season("EPL", current_season())
+    assert not is_app_season("Serie_A", None)
+    assert not is_app_season("EPL", current_season() - 1)
+
+def test_app_season_gets_sidecar_and_snapshot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert save_dataset("season_stats", [SEASON_ROW])
+
+    assert pd.read_csv(CSV_PATHS["season_stats"]).to_dict("records") == [SEASON_ROW]
+    assert read_sidecar(CSV_PATHS["season_stats"])["Player"].tolist() == ["A Player"]
+    assert as_of("season_stats")["Player"].tolist() == ["A Player"]
+
+def test_other_leagues_and_seasons_go_to_partitions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert save_dataset("season_stats", [SEASON_ROW], "Serie_A")
+    assert save_dataset("form_stats", [FORM_ROW], "EPL", current_season() - 1)
+
+    assert os.listdir("data") == ["partitioned"]
+    assert pd.read_csv(partition_path("season_stats", "Serie_A")).to_dict("records") == [SEASON_ROW]
+    assert pd.read_csv(partition_path("form_stats", "EPL", current_season() - 1)).to_dict("records") == [FORM_ROW]
+
+def test_nothing_to_save(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert not save_dataset("form_stats", [])
+    assert not os.path.exists("data")
+
+def test_streamed_app_csvs_get_sidecar_and_snapshot(tmp_path, monkeypatch):
+    from async_scraper import OUTPUTS, CsvStreamWriter, make_jobs
+    monkeypatch.chdir(tmp_path)
+    writer = CsvStreamWriter(OUTPUTS)
+    writer.write(make_jobs(datasets=["season_stats"])[0], [SEASON_ROW])
+    writer.close()
+
+    assert writer.saved == ["season_stats"]
+    assert read_sidecar(CSV_PATHS["season_stats"])["Player"].tolist() == ["A Player"]
+    assert as_of("season_stats")["Player"].tolist() == ["A Player"]
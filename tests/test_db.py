@@ -0,0 +1,81 @@
+import os
+import uuid
+from datetime import date
+import pytest
+import db
+
+# Runs against a real Postgres, e.g. TEST_DATABASE_URL=postgresql://localhost/fpl_test; every
+# test works in its own schema, which is dropped afterwards
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL") or os.environ.get("DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="set TEST_DATABASE_URL or DATABASE_URL to run the Postgres tests")
+
+DAY = date(2025, 10, 4)
+
+def season_row(player, team="Arsenal", minutes=900, xa90=0.1):
+    return {"Player": player, "Team": team, "Minutes": minutes, "NpGI90": 0.5, "xA90": xa90,
+            "NPxG90_xA90": 0.6, "xGChain90": 0.7, "xGBuildup90": 0.2}
+
+def form_row(player, team="Arsenal", xa90=0.1):
+    return {"Player": player, "Team": team, "xA90": xa90, "NPxG90_xA90": 0.6, "xGChain90": 0.7, "xGBuildup90": 0.2}
+
+@pytest.fixture
+def dsn():
+    import psycopg2
+    from psycopg2.extensions import make_dsn
+    schema = f"fpl_test_{uuid.uuid4().hex[:8]}"
+    admin = psycopg2.connect(TEST_DATABASE_URL)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema}")
+    try:
+        yield make_dsn(TEST_DATABASE_URL, options=f"-c search_path={schema}")
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+@pytest.fixture
+def pool(dsn):
+    from psycopg2.pool import ThreadedConnectionPool
+    pool = ThreadedConnectionPool(1, 2, dsn, **db.CONNECT_OPTIONS)
+    yield pool
+    pool.closeall()
+
+def load_count(pool, dataset):
+    with db.connection(pool) as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM loads WHERE dataset = %s", (dataset,))
+        return cur.fetchone()[0]
+
+def test_copy_upsert(dsn, pool):
+    db.load_run({"season_stats": [season_row("Bukayo Saka"), season_row("Martin Ødegaard", minutes=800)]}, DAY, dsn)
+    db.load_run({"season_stats": [season_row("Bukayo Saka", xa90=0.3), season_row("Martin Odegaard", minutes=810)]}, DAY, dsn)
+
+    df = db.read_dataset("season_stats", pool=pool)
+    # Rows are keyed by the accent-folded name, so the second spelling updates the first
+    assert len(df) == 2
+    assert df.set_index("Player").loc["Bukayo Saka", "xA90"] == 0.3
+    assert df.set_index("Player").loc["Martin Odegaard", "Minutes"] == 810
+    assert db.dataset_version("season_stats", pool) == 2
+
+def test_missing_players_are_deleted(dsn, pool):
+    db.load_run({"form_stats": [form_row("Bukayo Saka"), form_row("Kai Havertz")]}, DAY, dsn)
+    db.load_run({"form_stats": [form_row("Bukayo Saka")]}, DAY, dsn)
+    assert db.read_dataset("form_stats", pool=pool)["Player"].tolist() == ["Bukayo Saka"]
+
+    # Other days' snapshots are untouched
+    db.load_run({"form_stats": [form_row("Declan Rice")]}, date(2025, 10, 11), dsn)
+    assert db.read_dataset("form_stats", DAY, pool)["Player"].tolist() == ["Bukayo Saka"]
+    assert db.read_dataset("form_stats", pool=pool)["Player"].tolist() == ["Declan Rice"]
+
+def test_failed_run_rolls_back(dsn, pool):
+    db.load_run({"season_stats": [season_row("Bukayo Saka")], "form_stats": [form_row("Bukayo Saka")]}, DAY, dsn)
+
+    with pytest.raises(Exception):
+        # The season rows load, then the form COPY fails on a non-numeric metric
+        db.load_run({"season_stats": [season_row("Bukayo Saka", xa90=0.9), season_row("Kai Havertz")],
+                     "form_stats": [form_row("Bukayo Saka", xa90="n/a")]}, DAY, dsn)
+
+    season = db.read_dataset("season_stats", pool=pool)
+    assert season["Player"].tolist() == ["Bukayo Saka"]
+    assert season["xA90"].tolist() == [0.1]
+    assert load_count(pool, "season_stats") == load_count(pool, "form_stats") == 1
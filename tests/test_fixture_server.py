@@ -0,0 +1,48 @@
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+import pandas as pd
+import pytest
+from conftest import needs_chromium
+from fixture_server import fixture_for, serve, time_script
+
+# Per-response latency of the timed scrapes, and the most each may take. The old fixed
+# sleeps alone added up to about 9s, so a budget well under that catches them coming back.
+LATENCY = 0.05
+SCRAPE_BUDGETS = {"data": 6.0, "dom": 8.0}
+
+def fetch(url, form=None):
+    data = urllib.parse.urlencode(form).encode() if form else None
+    with urllib.request.urlopen(url, data=data, timeout=10) as response:
+        return response.status, response.read().decode("utf-8")
+
+def test_routes():
+    assert fixture_for("GET", "/league/EPL", {})[0] == "league_EPL.html"
+    assert fixture_for("GET", "/league/EPL/2025", {})[0] == "league_EPL.html"
+    assert fixture_for("GET", "/player/1001", {})[0] == "player_1001.html"
+    assert fixture_for("POST", "/main/getPlayersStats/", {"league": ["EPL"], "n_last_matches": ["5"]})[0] == "players_stats_EPL_5.json"
+    assert fixture_for("GET", "/main/getPlayersStats/", {})[0] is None
+
+def test_serves_saved_pages(fixture_site):
+    status, body = fetch(f"{fixture_site}/league/EPL/2025")
+    assert status == 200 and "playersData" in body
+    status, body = fetch(f"{fixture_site}/main/getPlayersStats/", {"league": "EPL", "season": "2025", "n_last_matches": "5"})
+    assert status == 200 and len(json.loads(body)["response"]["players"]) == 25
+    with pytest.raises(urllib.error.HTTPError) as error:
+        fetch(f"{fixture_site}/player/9999")
+    assert error.value.code == 404
+
+@needs_chromium
+@pytest.mark.parametrize("mode", ["data", "dom"])
+@pytest.mark.parametrize("script, dataset, rows", [("player_stat1.py", "season_stats", 40), ("playwrit.py", "form_stats", 24)])
+def test_scrape_within_budget(tmp_path, script, dataset, rows, mode):
+    server, base_url = serve(latency=LATENCY)
+    try:
+        elapsed, returncode = time_script(script, ["--mode", mode], base_url, str(tmp_path))
+    finally:
+        server.shutdown()
+    assert returncode == 0
+    assert len(pd.read_csv(os.path.join(tmp_path, "data", f"{dataset}.csv"))) == rows
+    assert elapsed <= SCRAPE_BUDGETS[mode], f"{script} --mode {mode} took {elapsed:.2f}s"
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from influence import leverage, r_factor
+
+@pytest.fixture
+def exog():
+    rng = np.random.default_rng(0)
+    return np.column_stack([np.ones(200), rng.normal(size=(200, 4))])
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 5, 6, 17, 50_000])
+def test_r_factor_any_chunk_size(exog, chunk_size):
+    expected = np.linalg.qr(exog, mode="r")
+    # R is unique up to the signs of its rows
+    np.testing.assert_allclose(np.abs(r_factor(exog, chunk_size)), np.abs(expected), atol=1e-10)
+
+def test_leverage_matches_hat_matrix(exog):
+    weights = np.random.default_rng(1).uniform(0.5, 2, len(exog))
+    xw = np.sqrt(weights)[:, None] * exog
+    expected = np.diag(xw @ np.linalg.pinv(xw.T @ xw) @ xw.T)
+    hat, rank = leverage(exog, weights, chunk_size=7)
+    np.testing.assert_allclose(hat, expected, atol=1e-10)
+    assert rank == exog.shape[1]
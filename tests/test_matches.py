@@ -0,0 +1,97 @@
+import asyncio
+import pandas as pd
+import pytest
+import understat
+from conftest import needs_chromium, read_fixture
+from matches import current_form, ingest, load_matches, merge_matches, rolling_form, save_matches, stale_players
+from understat import match_record, parse_matches_data, parse_players, parse_players_data
+
+SEASON = 2025
+PLAYER_ID = 1001
+
+@pytest.fixture
+def league():
+    return parse_players_data(read_fixture("league_EPL.html"))
+
+@pytest.fixture
+def records():
+    return parse_players(parse_matches_data(read_fixture(f"player_{PLAYER_ID}.html")), match_record, PLAYER_ID)
+
+def test_match_records_take_the_page_player_id(records):
+    assert len(records) == 19
+    assert {record["player_id"] for record in records} == {PLAYER_ID}
+
+def test_merge_keeps_the_ingested_season(league, records):
+    merged, fetched = merge_matches(load_matches("missing.parquet"), records, league, "EPL", SEASON)
+    entry = next(p for p in league if int(p["id"]) == PLAYER_ID)
+    assert len(fetched) == int(entry["games"]) == 15
+    assert merged["time"].sum() == int(entry["time"])
+    assert (merged["Player"] == entry["player_name"]).all()
+    assert merged["date"].is_monotonic_increasing
+    assert (merged["league"] == "EPL").all()
+
+def test_store_round_trip(tmp_path, league, records):
+    path = str(tmp_path / "matches.parquet")
+    merged, _ = merge_matches(load_matches(path), records, league, "EPL", SEASON)
+    save_matches(merged, path)
+    stored = load_matches(path)
+    pd.testing.assert_frame_equal(stored, merged)
+
+    # Fetching the same page again changes nothing, and the player is no longer stale
+    remerged, _ = merge_matches(stored, records, league, "EPL", SEASON)
+    pd.testing.assert_frame_equal(remerged, stored)
+    assert PLAYER_ID not in {int(p["id"]) for p in stale_players(league, stored, "EPL", SEASON)}
+
+def test_rolling_form(league, records):
+    merged, _ = merge_matches(load_matches("missing.parquet"), records, league, "EPL", SEASON)
+    window = rolling_form(merged, games=5)
+    latest = merged.tail(5)
+    assert window["games"].iloc[-1] == 5
+    assert window["time"].iloc[-1] == latest["time"].sum()
+    assert window["npxG"].iloc[-1] == pytest.approx(latest["npxG"].sum())
+    assert window["games"].iloc[:5].tolist() == [1, 2, 3, 4, 5]
+
+    by_minutes = rolling_form(merged, minutes=300).iloc[-1]
+    assert by_minutes["time"] >= 300
+    assert by_minutes["time"] - merged["time"].iloc[-by_minutes["games"]] < 300
+
+    form = current_form(merged, games=5, season=SEASON)
+    assert form["Player"].tolist() == ["Erling Haaland"]
+    assert form["xA90"].iloc[0] == round(latest["xA"].sum() * 90 / latest["time"].sum(), 2)
+
+def test_form_is_per_league_season(league, records):
+    merged, _ = merge_matches(load_matches("missing.parquet"), records, league, "EPL", SEASON)
+    # The same player's matches ingested for another league and season share the store
+    other = merged.assign(league="Serie_A", match_id=merged["match_id"] + 10**6)
+    other_season = merged.assign(season=SEASON - 1, match_id=merged["match_id"] + 2 * 10**6)
+    store = pd.concat([merged, other, other_season], ignore_index=True)
+
+    expected = current_form(merged, games=5, season=SEASON)
+    pd.testing.assert_frame_equal(current_form(store, games=5, season=SEASON), expected)
+    assert current_form(store, games=5, league="Serie_A", season=SEASON)["xA90"].tolist() == expected["xA90"].tolist()
+    assert current_form(store, games=5, season=SEASON + 1).empty
+
+def test_players_who_stop_appearing_lose_their_form():
+    # Two teammates play ten matches together, then B misses the team's last three
+    rows = []
+    for i in range(10):
+        for player_id, name in ((1, "A"), (2, "B")):
+            if player_id == 2 and i >= 7:
+                continue
+            rows.append({"league": "EPL", "player_id": player_id, "Player": name, "Team": "Team", "match_id": i,
+                         "date": f"{SEASON}-09-{i + 10}", "season": SEASON, "time": 90, "npg": 0, "assists": 0,
+                         "npxG": 0.3, "xA": 0.1, "xGChain": 0.5, "xGBuildup": 0.2})
+    matches = pd.DataFrame(rows)
+    assert current_form(matches, games=5, season=SEASON)["Player"].tolist() == ["A"]
+    assert current_form(matches, games=5, season=SEASON, recent=4)["Player"].tolist() == ["A", "B"]
+    # As of the match B last played, both players are current
+    assert current_form(matches, games=5, as_of=f"{SEASON}-09-16", season=SEASON)["Player"].tolist() == ["A", "B"]
+
+@needs_chromium
+def test_ingest_from_fixture_site(tmp_path, monkeypatch, fixture_site):
+    monkeypatch.setattr(understat, "BASE_URL", fixture_site)
+    path = str(tmp_path / "matches.parquet")
+    assert asyncio.run(ingest("EPL", SEASON, concurrency=8, rate=100, path=path)) == 15
+    assert set(load_matches(path)["player_id"]) == {PLAYER_ID}
+    # Only players whose appearances moved are fetched again
+    assert asyncio.run(ingest("EPL", SEASON, concurrency=8, rate=100, path=path)) == 0
@@ -0,0 +1,25 @@
+import json
+import pytest
+import metrics
+
+class StopScript(BaseException):
+    """Stands in for Streamlit's RerunException and StopException"""
+
+def statuses(directory, job):
+    with open(directory / f"{job}.jsonl", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    return [event["labels"]["status"] for event in events if event["name"] == "total"]
+
+def test_every_run_is_flushed_with_its_outcome(tmp_path):
+    with metrics.run("job", str(tmp_path)):
+        with metrics.timer("load"):
+            pass
+    with pytest.raises(ValueError):
+        with metrics.run("job", str(tmp_path)):
+            raise ValueError
+    with pytest.raises(StopScript):
+        with metrics.run("job", str(tmp_path)):
+            raise StopScript
+
+    assert statuses(tmp_path, "job") == ["ok", "error", "interrupted"]
+    assert metrics.timer("load") is metrics.NULL_SPAN
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+from model import PREDICTORS, add_features, apply_capping, rank_form
+
+@pytest.fixture
+def form():
+    rng = np.random.default_rng(2)
+    n = 80
+    xa = rng.gamma(2, 0.06, n)
+    npxg_xa = xa + rng.gamma(2, 0.12, n)
+    chain = npxg_xa + rng.gamma(2, 0.1, n)
+    df = pd.DataFrame({
+        "Player": [f"Player {i}" for i in range(n)],
+        "Team": [f"Team {i % 20}" for i in range(n)],
+        "xA90": xa.round(2),
+        "NPxG90_xA90": npxg_xa.round(2),
+        "xGChain90": chain.round(2),
+        "xGBuildup90": (chain * rng.uniform(0.2, 0.6, n)).round(2)
+    })
+    # Identical rows tie, and a player with no attacking output is dropped
+    df.loc[1, ["xA90", "NPxG90_xA90", "xGChain90", "xGBuildup90"]] = df.loc[0, ["xA90", "NPxG90_xA90", "xGChain90", "xGBuildup90"]]
+    df.loc[2, ["xA90", "NPxG90_xA90"]] = 0.0
+    return df
+
+@pytest.mark.parametrize("caps", [{}, {"xA90": 0.15, "NPxG90_xA90": 0.5, "xGChain90": 0.7, "xGBuildup90": 0.3}])
+def test_rank_form_matches_statsmodels_ols(form, caps):
+    ranked = rank_form(form, caps)
+
+    capped = add_features(apply_capping(form, caps).copy())
+    X = sm.add_constant(capped[PREDICTORS])
+    expected = sm.OLS(capped["NPxG90_xA90"], X).fit().predict(X)
+    expected_rank = expected.rank(ascending=False)
+
+    assert 2 not in ranked.index
+    np.testing.assert_array_equal(ranked["NPGI Per 90"].sort_index().to_numpy(), expected.sort_index().to_numpy())
+    pd.testing.assert_series_equal(ranked["Rank"].sort_index(), expected_rank.sort_index(), check_names=False)
+    assert ranked.loc[0, "Rank"] == ranked.loc[1, "Rank"]
+    assert ranked["Rank"].is_monotonic_increasing
@@ -0,0 +1,31 @@
+import pytest
+from search_index import SearchIndex, fold
+
+PLAYERS = ["Bruno Guimarães", "Erling Haaland", "Mohamed Salah", "Martin Ødegaard", "Bruno Fernandes", "Sam Morsy"]
+TEAMS = ["Newcastle United", "Manchester City", "Liverpool", "Arsenal", "Manchester United", "Ipswich"]
+
+@pytest.fixture
+def index():
+    return SearchIndex(PLAYERS, TEAMS)
+
+def names(index, query):
+    return [PLAYERS[i] for i in index.search(query)]
+
+@pytest.mark.parametrize("query, expected", [
+    # Accents are folded away
+    ("guimaraes", "Bruno Guimarães"),
+    # A misspelling still shares most trigrams
+    ("haland", "Erling Haaland"),
+    # The last word is matched as a prefix while it is being typed
+    ("mo sal", "Mohamed Salah")
+])
+def test_best_match(index, query, expected):
+    assert names(index, query)[0] == expected
+
+def test_folding():
+    assert fold("Martin Ødegaard") == "martin odegaard"
+    assert names(SearchIndex(PLAYERS, TEAMS), "odegaard") == ["Martin Ødegaard"]
+
+def test_team_and_empty_queries(index):
+    assert names(index, "manchester")[:2] == ["Erling Haaland", "Bruno Fernandes"]
+    assert list(index.search("")) == list(range(len(PLAYERS)))
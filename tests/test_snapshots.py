@@ -0,0 +1,30 @@
+import os
+import pandas as pd
+from snapshots import append_snapshot, as_of, player_history
+
+def season(xa90):
+    return pd.DataFrame({"Player": ["Bukayo Saka", "Kai Havertz"], "Team": ["Arsenal", "Arsenal"], "xA90": xa90})
+
+def test_snapshots_only_store_changes(tmp_path):
+    root = str(tmp_path)
+    assert append_snapshot("season_stats", season([0.1, 0.2]), "2025-10-04", root)
+    assert append_snapshot("season_stats", season([0.1, 0.2]), "2025-10-11", root) is None
+    assert append_snapshot("season_stats", season([0.3, 0.2]), "2025-10-18", root)
+
+    assert as_of("season_stats", "2025-10-12", root)["xA90"].tolist() == [0.1, 0.2]
+    history = player_history("Bukayo Saka", "season_stats", root=root)
+    assert history["date"].tolist() == ["2025-10-04", "2025-10-18"]
+    assert history["xA90"].tolist() == [0.1, 0.3]
+
+def test_partial_files_stay_out_of_the_dataset(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    append_snapshot("season_stats", season([0.1, 0.2]), "2025-10-04", root)
+
+    # A write that dies before its rename leaves the partial file behind
+    monkeypatch.setattr(os, "replace", lambda *args: None)
+    append_snapshot("season_stats", season([0.5, 0.2]), "2025-10-11", root)
+    monkeypatch.undo()
+
+    partials = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(root) for name in names if name.endswith(".partial")]
+    assert partials and not any("dataset=" in path for path in partials)
+    assert player_history("Bukayo Saka", "season_stats", root=root)["xA90"].tolist() == [0.1]
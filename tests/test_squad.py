@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from squad import QUOTAS, max_plus, pick_squad
+
+def make_pool(size=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Player": [f"Player {i}" for i in range(size)],
+        "Web Name": [f"Player {i}" for i in range(size)],
+        "Team": [f"Club {i % 20}" for i in range(size)],
+        "Position": [list(QUOTAS)[i % len(QUOTAS)] for i in range(size)],
+        "Price": np.round(rng.uniform(4, 13, size), 1),
+        "Score": rng.uniform(0, 1, size)
+    })
+
+def test_max_plus_of_infeasible_row():
+    result = max_plus(np.full(5, -np.inf), np.arange(5.0))
+    assert result.shape == (5,)
+    assert np.isneginf(result).all()
+
+def test_max_plus_matches_brute_force():
+    rng = np.random.default_rng(1)
+    a = np.maximum.accumulate(np.where(rng.random(20) < 0.3, -np.inf, rng.random(20)))
+    b = np.maximum.accumulate(rng.random(20))
+    expected = [max(a[y] + b[x - y] for y in range(x + 1)) for x in range(20)]
+    np.testing.assert_array_equal(max_plus(a, b), expected)
+
+def test_pick_squad_fills_quotas():
+    squad = pick_squad(make_pool())
+    assert squad["Position"].value_counts().to_dict() == QUOTAS
+    assert squad["Price"].sum() <= 100.0
+    assert squad["Team"].value_counts().max() <= 3
+
+def test_pick_squad_infeasible_budget():
+    assert pick_squad(make_pool(), budget=10) is None
+
+def test_pick_squad_over_excluded_position():
+    pool = make_pool()
+    forwards = pool.index[pool["Position"] == "FWD"]
+    assert pick_squad(pool, excluded=forwards[:-2]) is None
+    assert pick_squad(pool, excluded=pool.index[pool["Position"] == "GK"]) is None
+
+def test_pick_squad_too_many_locked():
+    pool = make_pool()
+    keepers = pool.index[pool["Position"] == "GK"][:3]
+    assert pick_squad(pool, budget=200, locked=keepers) is None
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+from model import PREDICTORS, add_features, apply_capping, calculate_season_caps
+from threshold_sweep import COEFFICIENTS, caps_at, sweep
+
+@pytest.fixture
+def season():
+    rng = np.random.default_rng(0)
+    n = 120
+    xa = rng.gamma(2, 0.06, n)
+    npxg_xa = xa + rng.gamma(2, 0.12, n)
+    chain = npxg_xa + rng.gamma(2, 0.1, n)
+    df = pd.DataFrame({
+        "Player": [f"Player {i}" for i in range(n)],
+        "Team": [f"Team {i % 20}" for i in range(n)],
+        "Minutes": rng.integers(90, 3000, n),
+        "NpGI90": npxg_xa + rng.normal(0, 0.1, n),
+        "xA90": xa,
+        "NPxG90_xA90": npxg_xa,
+        "xGChain90": chain,
+        "xGBuildup90": chain * rng.uniform(0.2, 0.6, n)
+    })
+    # A player with no attacking output cannot be modelled and is dropped from every fit
+    df.loc[0, ["xA90", "NPxG90_xA90"]] = 0.0
+    return df
+
+@pytest.mark.parametrize("threshold", [0, 30, 60, 90])
+def test_sweep_matches_statsmodels_wls(season, threshold):
+    fits = sweep(season)
+    caps = calculate_season_caps(season, threshold / 100)
+    assert caps_at(fits, threshold) == pytest.approx(caps)
+
+    capped = add_features(apply_capping(season, caps).copy())
+    expected = sm.WLS(capped["NpGI90"], sm.add_constant(capped[PREDICTORS]), weights=capped["Minutes"]).fit()
+    fit = fits.loc[threshold]
+    if not caps:
+        # Uncapped thresholds carry no precomputed fit; the app fits those itself
+        assert np.isnan(fit["const"])
+        return
+    np.testing.assert_allclose(fit[COEFFICIENTS].to_numpy(float), expected.params.to_numpy(), rtol=1e-8)
+    assert fit["nobs"] == expected.nobs
+    for name in ["rsquared", "rsquared_adj", "fvalue", "aic", "bic"]:
+        assert fit[name] == pytest.approx(getattr(expected, name), rel=1e-8)
@@ -0,0 +1,67 @@
+import json
+import pytest
+from conftest import read_fixture
+from understat import (
+    form_record, parse_form_row, parse_players, parse_players_data, parse_rows, parse_season_row,
+    players_from_payload, season_record
+)
+
+@pytest.fixture
+def season_players():
+    return parse_players_data(read_fixture("league_EPL.html"))
+
+@pytest.fixture
+def form_players():
+    return players_from_payload(json.loads(read_fixture("players_stats_EPL_5.json")))
+
+def table_cells(players, view="All games", min_minutes=0):
+    """Table rows as the saved league page renders them (see cells() in league_EPL.html)"""
+    rows = []
+    for p in players:
+        minutes = int(p["time"])
+        if minutes < min_minutes:
+            continue
+        per90 = lambda value: f"{float(value) * 90 / minutes:.2f}"
+        chain = [per90(p["xA"]), per90(float(p["npxG"]) + float(p["xA"])), per90(p["xGChain"]), per90(p["xGBuildup"])]
+        if view == "All games":
+            rows.append([p["player_name"], p["team_title"], p["games"], p["time"], p["npg"], p["assists"], per90(p["npxG"])] + chain)
+        else:
+            rows.append([p["player_name"], p["team_title"], p["games"], p["time"], per90(p["npxG"])] + chain)
+    return rows
+
+def test_season_records_from_league_page(season_players):
+    records = parse_players(season_players, season_record)
+    assert len(records) == 40
+    assert records[0] == {
+        "Player": "Erling Haaland", "Team": "Manchester City", "Minutes": 1234, "NpGI90": pytest.approx(18 * 90 / 1234),
+        "xA90": 0.17, "NPxG90_xA90": 1.1, "xGChain90": 1.08, "xGBuildup90": 0.17
+    }
+    assert records[-1] == {
+        "Player": "Hugo Ekitike", "Team": "Liverpool", "Minutes": 721, "NpGI90": pytest.approx(0.4993065),
+        "xA90": 0.06, "NPxG90_xA90": 0.36, "xGChain90": 0.51, "xGBuildup90": 0.24
+    }
+
+def test_form_records_from_players_stats(form_players):
+    records = parse_players(form_players, form_record)
+    # Eli Junior Kroupi played 120 minutes, under the 180 minute filter
+    assert len(form_players) == 25 and len(records) == 24
+    assert "Eli Junior Kroupi" not in {record["Player"] for record in records}
+    assert records[0] == {"Player": "Erling Haaland", "Team": "Manchester City",
+                          "xA90": 0.17, "NPxG90_xA90": 1.1, "xGChain90": 1.08, "xGBuildup90": 0.17}
+    assert records[-1] == {"Player": "Enzo Fernández", "Team": "Chelsea",
+                           "xA90": 0.22, "NPxG90_xA90": 0.61, "xGChain90": 0.81, "xGBuildup90": 0.44}
+
+def test_season_data_and_dom_modes_agree(season_players):
+    from_data = parse_players(season_players, season_record)
+    from_dom = parse_rows(table_cells(season_players), parse_season_row)
+    assert from_dom == from_data
+
+def test_form_data_and_dom_modes_agree(form_players):
+    from_data = parse_players(form_players, form_record)
+    from_dom = parse_rows(table_cells(form_players, "5 games", min_minutes=180), parse_form_row)
+    assert from_dom == from_data
+
+def test_malformed_entries_are_skipped(season_players):
+    broken = [dict(season_players[0], time="n/a"), {"player_name": "No Stats"}] + season_players[1:]
+    assert parse_players(broken, season_record) == parse_players(season_players[1:], season_record)
+    assert parse_rows([["Player", "Team", "1"]], parse_season_row) == []
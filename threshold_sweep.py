@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from model import CAP_COLUMNS, CAP_QUANTILE, MIN_QUALIFIED, PREDICTORS
+
+# Precomputes caps and the minutes-weighted season fit for every slider position (0-100%).
+# The eligible set at a threshold is always the top-k players by minutes, so after one sort
+# each threshold reduces to a prefix length k and thresholds sharing k share all their work.
+THRESHOLDS = np.arange(101)
+COEFFICIENTS = ['const'] + PREDICTORS
+CAP_FIELDS = [f'cap_{col}' for col in CAP_COLUMNS]
+FIT_FIELDS = COEFFICIENTS + ['nobs', 'rsquared', 'rsquared_adj', 'fvalue', 'aic', 'bic']
+
+def _prefix_quantiles(values, sizes):
+    """Quantile of every column over the first k rows, for each k in sizes"""
+    n = len(values)
+    mask = np.arange(n)[None, :] >= sizes[:, None]
+    stacked = np.where(mask[:, :, None], np.nan, values[None, :, :])
+    return np.nanquantile(stacked, CAP_QUANTILE, axis=1)
+
+def _design(season, caps):
+    """Capped design matrices and valid-row masks for a batch of cap vectors"""
+    xa, npxg_xa, chain, buildup = (np.minimum(season[col].to_numpy(float)[None, :], caps[:, [i]]) for i, col in enumerate(CAP_COLUMNS))
+    chain_buildup = chain - buildup
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sp_chain_buildup = (npxg_xa - chain_buildup) / npxg_xa
+    X = np.stack([np.ones_like(xa), chain_buildup, sp_chain_buildup, xa], axis=2)
+    return X, np.isfinite(X).all(axis=2)
+
+def sweep(season_df, thresholds=THRESHOLDS, batch_size=16):
+    """Caps, WLS coefficients and fit statistics for each threshold percentage"""
+    # Rows with missing values anywhere are dropped by the app's dropna as well
+    season = season_df[season_df.notna().all(axis=1)]
+    season = season.sort_values('Minutes', ascending=False, kind='mergesort')
+    w = season['Minutes'].to_numpy(float)
+    y = season['NpGI90'].to_numpy(float)
+
+    # Eligible counts from the full frame, as calculate_season_caps sees it
+    all_minutes = np.sort(season_df['Minutes'].to_numpy(float))
+    max_minutes = all_minutes[-1] if len(all_minutes) else 0
+    eligible = len(all_minutes) - np.searchsorted(all_minutes, max_minutes * (thresholds / 100), side='left')
+    capped = (thresholds > 0) & (eligible >= MIN_QUALIFIED)
+
+    results = pd.DataFrame(index=pd.Index(thresholds, name='threshold'))
+    results['eligible'] = eligible
+    for col in CAP_FIELDS + FIT_FIELDS:
+        results[col] = np.nan
+
+    # Thresholds with the same eligible count share caps and fits
+    sizes, inverse = np.unique(eligible[capped], return_inverse=True)
+    if len(sizes) == 0:
+        return results
+    # Caps are taken over the full deduplicated frame, ordered by minutes
+    ordered = season_df.sort_values('Minutes', ascending=False, kind='mergesort')[CAP_COLUMNS].to_numpy(float)
+    caps = _prefix_quantiles(ordered, sizes)
+
+    p = len(COEFFICIENTS)
+    stats = np.full((len(sizes), p + 6), np.nan)
+    for start in range(0, len(sizes), batch_size):
+        batch = slice(start, start + batch_size)
+        X, valid = _design(season, caps[batch])
+        X = np.where(valid[:, :, None], X, 0.0)
+        weights = np.where(valid, w[None, :], 0.0)
+
+        xtwx = np.einsum('bni,bn,bnj->bij', X, weights, X)
+        xtwy = np.einsum('bni,bn,n->bi', X, weights, y)
+        beta = np.einsum('bij,bj->bi', np.linalg.pinv(xtwx), xtwy)
+
+        nobs = valid.sum(axis=1)
+        resid = y[None, :] - np.einsum('bni,bi->bn', X, beta)
+        ssr = (weights * resid**2).sum(axis=1)
+        y_mean = (weights * y[None, :]).sum(axis=1) / weights.sum(axis=1)
+        tss = (weights * (y[None, :] - y_mean[:, None])**2).sum(axis=1)
+        with np.errstate(divide='ignore'):
+            log_w = np.where(valid, np.log(np.where(valid, weights, 1.0)), 0.0).sum(axis=1)
+        df_model, df_resid = p - 1, nobs - p
+        rsquared = 1 - ssr / tss
+        llf = -nobs / 2 * (np.log(2 * np.pi) + np.log(ssr / nobs) + 1) + log_w / 2
+        stats[batch] = np.column_stack([
+            beta, nobs, rsquared,
+            1 - (nobs - 1) / df_resid * (1 - rsquared),
+            ((tss - ssr) / df_model) / (ssr / df_resid),
+            -2 * llf + 2 * p,
+            -2 * llf + np.log(nobs) * p
+        ])
+
+    results.loc[capped, CAP_FIELDS] = caps[inverse]
+    results.loc[capped, FIT_FIELDS] = stats[inverse]
+    return results
+
+def caps_at(results, threshold):
+    """Caps dict for one threshold percentage, empty when the threshold applies no capping"""
+    row = results.loc[threshold]
+    if np.isnan(row[CAP_FIELDS[0]]):
+        return {}
+    return {col: float(row[field]) for col, field in zip(CAP_COLUMNS, CAP_FIELDS)}
@@ -0,0 +1,341 @@
+import json
+import logging
+import os
+import re
+from datetime import date
+import metrics
+from columns import FORM_COLUMNS, MATCH_COLUMNS, SEASON_COLUMNS
+
+# Shared helpers for reading the understat.com league player table.
+# UNDERSTAT_BASE_URL points the scrapers at a local fixture server (see fixture_server.py)
+BASE_URL = os.environ.get("UNDERSTAT_BASE_URL", "https://understat.com").rstrip("/")
+LEAGUES = ("EPL", "La_liga", "Bundesliga", "Serie_A", "Ligue_1", "RFPL")
+# The app's CSVs, sidecars and snapshots hold the current EPL season only; scrapes of any
+# other league or season are written as dataset=/league=/season= partitions under here
+PARTITIONED_ROOT = "data/partitioned"
+LEAGUE_URL = f"{BASE_URL}/league/EPL"
+PLAYERS_STATS_URL = f"{BASE_URL}/main/getPlayersStats/"
+PLAYER_ROWS = "#league-players > table > tbody > tr"
+TABLE_POPUP = "#league-players > .table-popup"
+
+# Reads the text of every cell of every visible row in a single evaluation
+ROWS_SCRIPT = "rows => rows.map(row => Array.from(row.cells, cell => cell.innerText.trim()))"
+
+# The table is rebuilt from scratch on every render, so a marked row disappearing
+# means the new page, filter or column set is in the DOM.
+MARK_ROWS_SCRIPT = "sel => document.querySelectorAll(sel).forEach(row => row.dataset.stale = '1')"
+RERENDERED_SCRIPT = """sel => {
+    const rows = document.querySelectorAll(sel);
+    return rows.length > 0 && !Array.from(rows).some(row => row.dataset.stale);
+}"""
+
+
+def wait_for_players(page):
+    """Wait for the player table to render; False when it has no rows yet"""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+    logging.info("Waiting for player table...")
+    page.wait_for_selector("#league-players", timeout=15000)
+    try:
+        page.wait_for_selector(PLAYER_ROWS, timeout=10000)
+    except PlaywrightTimeout:
+        logging.error("No player data found in table - season may not have started yet")
+        return False
+    return True
+
+
+def open_table_popup(page):
+    """Open the column configuration popup and wait until it is shown"""
+    page.locator("#league-players").scroll_into_view_if_needed()
+    page.locator("#league-players").get_by_role("button").click()
+    page.locator(TABLE_POPUP).wait_for(state="visible", timeout=5000)
+
+
+def rerender(page, action, timeout=10000):
+    """Run an action that re-renders the player table and wait for the new rows"""
+    page.evaluate(MARK_ROWS_SCRIPT, PLAYER_ROWS)
+    action()
+    page.wait_for_function(RERENDERED_SCRIPT, arg=PLAYER_ROWS, timeout=timeout)
+
+
+def apply_table_popup(page):
+    """Apply the popup settings and wait for the table to redraw with the new columns"""
+    rerender(page, page.locator("#league-players").get_by_text("Apply").click)
+    page.locator(TABLE_POPUP).wait_for(state="hidden", timeout=5000)
+
+
+def extract_rows(page):
+    """Fetch the current page of the player table as lists of cell texts in one round trip"""
+    return page.eval_on_selector_all(PLAYER_ROWS, ROWS_SCRIPT)
+
+
+def parse_season_row(cells):
+    """Map the season table cells (All games view) to a season_stats record"""
+    player = cells[0]
+    if not player:
+        return None
+
+    minutes = int(cells[3])
+    npg = float(cells[4])
+    assists = float(cells[5])
+    return {
+        "Player": player,
+        "Team": cells[1],
+        "Minutes": minutes,
+        "NpGI90": (npg + assists) * 90 / minutes if minutes > 0 else 0,
+        "xA90": float(cells[7]),
+        "NPxG90_xA90": float(cells[8]),
+        "xGChain90": float(cells[9]),
+        "xGBuildup90": float(cells[10])
+    }
+
+
+def parse_form_row(cells):
+    """Map the form table cells (5 games view) to a form_stats record"""
+    player = cells[0]
+    if not player:
+        return None
+
+    return {
+        "Player": player,
+        "Team": cells[1],
+        "xA90": float(cells[5]),
+        "NPxG90_xA90": float(cells[6]),
+        "xGChain90": float(cells[7]),
+        "xGBuildup90": float(cells[8])
+    }
+
+
+def parse_rows(rows, parse_row):
+    """Convert extracted cell rows to typed records, skipping rows that fail to parse"""
+    records = []
+    for i, cells in enumerate(rows):
+        try:
+            record = parse_row(cells)
+        except (IndexError, ValueError) as e:
+            logging.warning(f"Error parsing row {i}: {e}")
+            metrics.count("parse_failures", parser=parse_row.__name__)
+            continue
+        if record:
+            records.append(record)
+    return records
+
+
+# The league page ships the season totals as `var playersData = JSON.parse('...')`
+# with quotes and other special characters hex-escaped (\x22).
+PLAYERS_DATA = re.compile(r"var\s+playersData\s*=\s*JSON\.parse\('(.*?)'\)", re.S)
+# The fixture list (with an isResult flag per match) is embedded the same way
+DATES_DATA = re.compile(r"var\s+datesData\s*=\s*JSON\.parse\('(.*?)'\)", re.S)
+HEX_ESCAPE = re.compile(r"\\x([0-9A-Fa-f]{2})")
+
+# XHR endpoints that return the player dataset when it is not embedded in the page
+PLAYER_DATA_ENDPOINTS = ("getLeagueData", "getPlayersStats")
+PLAYERS_DATA_SCRIPT = "() => typeof playersData !== 'undefined' ? playersData : null"
+
+# Player pages carry that player's per-match history the same way, as matchesData,
+# whose entries do not repeat the player's id
+MATCHES_DATA = re.compile(r"var\s+matchesData\s*=\s*JSON\.parse\('(.*?)'\)", re.S)
+MATCH_DATA_ENDPOINT = "getPlayerData"
+MATCHES_DATA_SCRIPT = "() => typeof matchesData !== 'undefined' ? matchesData : null"
+
+
+def current_season(today=None):
+    """Return the understat season key (the starting year) for a date"""
+    today = today or date.today()
+    return today.year if today.month >= 7 else today.year - 1
+
+
+def is_app_season(league="EPL", season=None):
+    """True for the league and season the app reads (the current EPL season)"""
+    return league == "EPL" and season in (None, current_season())
+
+
+def partition_path(dataset, league, season=None, root=PARTITIONED_ROOT):
+    """CSV holding one dataset of one league and season in the partitioned layout"""
+    season = season or current_season()
+    return os.path.join(root, f"dataset={dataset}", f"league={league}", f"season={season}", "part.csv")
+
+
+def league_url(league="EPL", season=None):
+    """League page URL; without a season understat serves the current one"""
+    url = f"{BASE_URL}/league/{league}"
+    return f"{url}/{season}" if season else url
+
+
+def player_url(player_id):
+    return f"{BASE_URL}/player/{player_id}"
+
+
+def player_id_of(url):
+    """Player id from a player page URL"""
+    return int(url.rstrip("/").rsplit("/", 1)[-1])
+
+
+def decode_embedded(pattern, html):
+    """Decode a hex-escaped JSON.parse('...') payload from page source, or None if absent"""
+    match = pattern.search(html)
+    if not match:
+        return None
+    raw = HEX_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), match.group(1))
+    return json.loads(raw.replace("\\'", "'"))
+
+
+def parse_players_data(html):
+    """Decode the embedded playersData array from a saved league page, or None if absent"""
+    return decode_embedded(PLAYERS_DATA, html)
+
+
+def parse_dates_data(html):
+    """Decode the embedded datesData fixture list from a league page, or None if absent"""
+    return decode_embedded(DATES_DATA, html)
+
+
+def parse_matches_data(html):
+    """Decode the embedded matchesData history from a saved player page, or None if absent"""
+    return decode_embedded(MATCHES_DATA, html)
+
+
+def players_from_payload(payload):
+    """Pull the player list out of an understat XHR response body"""
+    if isinstance(payload, list):
+        return payload
+    if not isinstance(payload, dict):
+        return None
+    if isinstance(payload.get("players"), list):
+        return payload["players"]
+    return players_from_payload(payload.get("response"))
+
+
+def matches_from_payload(payload):
+    """Pull the match list out of an understat player data response body"""
+    if isinstance(payload, list):
+        return payload
+    if not isinstance(payload, dict):
+        return None
+    if isinstance(payload.get("matches"), list):
+        return payload["matches"]
+    return matches_from_payload(payload.get("response"))
+
+
+def per90(value, minutes):
+    """Per-90 rate rounded the way the understat table displays it"""
+    return round(float(value) * 90 / minutes, 2) if minutes > 0 else 0
+
+
+def season_record(player):
+    """Compute a season_stats record from an understat player totals entry"""
+    minutes = int(player["time"])
+    npg = float(player["npg"])
+    assists = float(player["assists"])
+    return {
+        "Player": player["player_name"],
+        "Team": player["team_title"],
+        "Minutes": minutes,
+        "NpGI90": (npg + assists) * 90 / minutes if minutes > 0 else 0,
+        "xA90": per90(player["xA"], minutes),
+        "NPxG90_xA90": per90(float(player["npxG"]) + float(player["xA"]), minutes),
+        "xGChain90": per90(player["xGChain"], minutes),
+        "xGBuildup90": per90(player["xGBuildup"], minutes)
+    }
+
+
+def form_record(player, min_minutes=180):
+    """Compute a form_stats record, or None when the player is under the minutes filter"""
+    minutes = int(player["time"])
+    if minutes < min_minutes:
+        return None
+    return {
+        "Player": player["player_name"],
+        "Team": player["team_title"],
+        "xA90": per90(player["xA"], minutes),
+        "NPxG90_xA90": per90(float(player["npxG"]) + float(player["xA"]), minutes),
+        "xGChain90": per90(player["xGChain"], minutes),
+        "xGBuildup90": per90(player["xGBuildup"], minutes)
+    }
+
+
+def match_record(match, player_id):
+    """Typed per-match record from a player's understat matchesData entry"""
+    return {
+        "player_id": int(player_id),
+        "match_id": int(match["id"]),
+        "date": match["date"][:10],
+        "season": int(match["season"]),
+        "time": int(match["time"]),
+        "npg": int(match["npg"]),
+        "assists": int(match["assists"]),
+        "npxG": float(match["npxG"]),
+        "xA": float(match["xA"]),
+        "xGChain": float(match["xGChain"]),
+        "xGBuildup": float(match["xGBuildup"])
+    }
+
+
+def parse_players(players, to_record, *args):
+    """Convert understat player entries to records (to_record(entry, *args)), skipping malformed entries"""
+    records = []
+    for i, player in enumerate(players):
+        try:
+            record = to_record(player, *args)
+        except (KeyError, TypeError, ValueError) as e:
+            logging.warning(f"Error parsing player entry {i}: {e}")
+            metrics.count("parse_failures", parser=to_record.__name__)
+            continue
+        if record:
+            records.append(record)
+    return records
+
+
+def is_player_data_response(response):
+    """True for XHR responses that carry a player dataset"""
+    return any(endpoint in response.url for endpoint in PLAYER_DATA_ENDPOINTS)
+
+
+def form_data_request(league="EPL", season=None, last_matches=5):
+    """Form fields for the last-N-games player dataset request"""
+    return {
+        "league": league,
+        "season": str(season or current_season()),
+        "n_last_matches": str(last_matches)
+    }
+
+
+def capture_player_responses(page):
+    """Collect player dataset XHR responses; must be attached before navigating"""
+    responses = []
+
+    def on_response(response):
+        if is_player_data_response(response):
+            responses.append(response)
+
+    page.on("response", on_response)
+    return responses
+
+
+def read_players_data(page, responses=()):
+    """Read the season player dataset from the loaded league page in one pass"""
+    players = page.evaluate(PLAYERS_DATA_SCRIPT)
+    if players:
+        return players
+
+    for response in responses:
+        try:
+            players = players_from_payload(response.json())
+        except Exception as e:
+            logging.warning(f"Could not decode {response.url}: {e}")
+            continue
+        if players:
+            return players
+    return None
+
+
+def fetch_form_data(page, league="EPL", season=None, last_matches=5):
+    """Request the last-N-games player dataset through the page's browser context"""
+    try:
+        response = page.request.post(PLAYERS_STATS_URL, form=form_data_request(league, season, last_matches))
+        if not response.ok:
+            logging.warning(f"Form data request failed with status {response.status}")
+            return None
+        return players_from_payload(response.json())
+    except Exception as e:
+        logging.warning(f"Could not fetch form data: {e}")
+        return None